@@ -0,0 +1,50 @@
+"""auth_user lower(email) unique index
+
+Revision ID: 7a1c5e92d4b6
+Revises: 3e8d4b7a90c5
+Create Date: 2026-10-18 16:41:09.528114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a1c5e92d4b6'
+down_revision = '3e8d4b7a90c5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Signups used to compare emails exactly, accounts differing only by the
+    # case of their email have to be merged or deleted by hand first.
+    duplicates = op.get_bind().execute(sa.text("""
+        SELECT lower(email) AS email, array_agg(id ORDER BY id) AS ids
+        FROM auth_user
+        GROUP BY lower(email)
+        HAVING count(*) > 1
+        ORDER BY lower(email)
+    """)).all()
+    if duplicates:
+        listed = '\n'.join(f'  {row.email}: users {row.ids}' for row in duplicates)
+        raise RuntimeError(
+            f'{len(duplicates)} emails belong to several users once lowercased, '
+            f'resolve them before running this migration again:\n{listed}'
+        )
+
+    with op.get_context().autocommit_block():
+        # A failed concurrent build leaves an invalid index behind
+        invalid = op.get_bind().execute(sa.text("""
+            SELECT FROM pg_index
+            WHERE indexrelid = to_regclass('auth_user_email_lower_key')
+                AND NOT indisvalid
+        """)).first()
+        if invalid is not None:
+            op.drop_index('auth_user_email_lower_key', table_name='auth_user', postgresql_concurrently=True)
+        op.create_index('auth_user_email_lower_key', 'auth_user', [sa.text('lower(email)')], unique=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('auth_user_email_lower_key', table_name='auth_user', postgresql_concurrently=True)
@@ -0,0 +1,41 @@
+"""domain_information updated_at trigger
+
+Revision ID: 1fcb8ba922b9
+Revises: b84e2f1c6d37
+Create Date: 2026-10-18 20:31:52.604127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1fcb8ba922b9'
+down_revision = 'b84e2f1c6d37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The domain registry refreshes the rows changed since its last refresh
+    # from updated_at, updates which do not set it themselves bump it here.
+    op.execute("""
+        CREATE FUNCTION set_updated_at() RETURNS trigger AS $$
+        BEGIN
+            IF NEW.updated_at IS NOT DISTINCT FROM OLD.updated_at THEN
+                NEW.updated_at := now();
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER domain_information_set_updated_at
+        BEFORE UPDATE ON domain_information
+        FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+    """)
+
+
+def downgrade() -> None:
+    op.execute('DROP TRIGGER domain_information_set_updated_at ON domain_information;')
+    op.execute('DROP FUNCTION set_updated_at();')
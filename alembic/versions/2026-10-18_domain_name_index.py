@@ -0,0 +1,26 @@
+"""domain_information domain_name index
+
+Revision ID: 3e8d4b7a90c5
+Revises: 9c3f62d1e8a4
+Create Date: 2026-10-18 14:02:47.113580
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3e8d4b7a90c5'
+down_revision = '9c3f62d1e8a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('domain_information_domain_name_idx', 'domain_information', ['domain_name'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('domain_information_domain_name_idx', table_name='domain_information', postgresql_concurrently=True)
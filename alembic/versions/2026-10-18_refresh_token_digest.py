@@ -0,0 +1,96 @@
+"""refresh token digest
+
+Revision ID: 5b1e0c9a7f21
+Revises: d456a67c4a08
+Create Date: 2026-10-18 10:02:41.372910
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b1e0c9a7f21'
+down_revision = 'd456a67c4a08'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+
+def upgrade() -> None:
+    op.add_column('auth_refresh_token', sa.Column('refresh_token_digest', sa.LargeBinary(length=32), nullable=True))
+
+    # Rows written by application instances that are not aware of the column yet
+    # still get a digest while the backfill below is running.
+    op.execute("""
+        CREATE FUNCTION auth_refresh_token_set_digest() RETURNS trigger AS $$
+        BEGIN
+            IF NEW.refresh_token_digest IS NULL THEN
+                NEW.refresh_token_digest := sha256(convert_to(NEW.refresh_token, 'UTF8'));
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER auth_refresh_token_set_digest
+        BEFORE INSERT ON auth_refresh_token
+        FOR EACH ROW EXECUTE FUNCTION auth_refresh_token_set_digest();
+    """)
+
+    with op.get_context().autocommit_block():
+        # Every batch commits on its own, so only BATCH_SIZE rows are locked at a
+        # time. Batches walk the primary key, each one is a range of its index.
+        bind = op.get_bind()
+        after = None
+        while True:
+            upto = bind.execute(sa.text("""
+                SELECT uuid FROM (
+                    SELECT uuid FROM auth_refresh_token
+                    WHERE CAST(:after AS uuid) IS NULL OR uuid > CAST(:after AS uuid)
+                    ORDER BY uuid
+                    LIMIT :batch_size
+                ) batch
+                ORDER BY uuid DESC
+                LIMIT 1
+            """), {"after": after, "batch_size": BATCH_SIZE}).scalar()
+            if upto is None:
+                break
+            bind.execute(sa.text("""
+                UPDATE auth_refresh_token
+                SET refresh_token_digest = sha256(convert_to(refresh_token, 'UTF8'))
+                WHERE (CAST(:after AS uuid) IS NULL OR uuid > CAST(:after AS uuid))
+                    AND uuid <= :upto
+                    AND refresh_token_digest IS NULL
+            """), {"after": after, "upto": upto})
+            after = upto
+
+        op.create_index('auth_refresh_token_refresh_token_digest_idx', 'auth_refresh_token', ['refresh_token_digest'], unique=True, postgresql_concurrently=True)
+
+    # SET NOT NULL skips the full table scan under an exclusive lock when a
+    # validated CHECK constraint already proves it. Every step commits on its
+    # own: the exclusive lock of ADD CONSTRAINT is released before the scan of
+    # VALIDATE, which only takes a SHARE UPDATE EXCLUSIVE lock.
+    with op.get_context().autocommit_block():
+        op.execute("""
+            ALTER TABLE auth_refresh_token
+            ADD CONSTRAINT auth_refresh_token_refresh_token_digest_check
+            CHECK (refresh_token_digest IS NOT NULL) NOT VALID
+        """)
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TABLE auth_refresh_token VALIDATE CONSTRAINT auth_refresh_token_refresh_token_digest_check")
+    with op.get_context().autocommit_block():
+        op.execute("""
+            ALTER TABLE auth_refresh_token
+            ALTER COLUMN refresh_token_digest SET NOT NULL,
+            DROP CONSTRAINT auth_refresh_token_refresh_token_digest_check
+        """)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('auth_refresh_token_refresh_token_digest_idx', table_name='auth_refresh_token', postgresql_concurrently=True)
+    op.execute("DROP TRIGGER auth_refresh_token_set_digest ON auth_refresh_token")
+    op.execute("DROP FUNCTION auth_refresh_token_set_digest()")
+    op.drop_column('auth_refresh_token', 'refresh_token_digest')
@@ -0,0 +1,26 @@
+"""refresh token expires_at index
+
+Revision ID: 9c3f62d1e8a4
+Revises: 5b1e0c9a7f21
+Create Date: 2026-10-18 11:24:03.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c3f62d1e8a4'
+down_revision = '5b1e0c9a7f21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('auth_refresh_token_expires_at_idx', 'auth_refresh_token', ['expires_at'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('auth_refresh_token_expires_at_idx', table_name='auth_refresh_token', postgresql_concurrently=True)
@@ -0,0 +1,95 @@
+"""row change notifications
+
+Revision ID: b84e2f1c6d37
+Revises: 7a1c5e92d4b6
+Create Date: 2026-10-18 18:12:36.904417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b84e2f1c6d37'
+down_revision = '7a1c5e92d4b6'
+branch_labels = None
+depends_on = None
+
+# table -> (key columns sent for every changed row, events)
+TABLES = {
+    # Users are only cached once found, inserts cannot make the cache stale
+    'auth_user': (('id', 'email'), ('UPDATE', 'DELETE')),
+    'domain_information': (('id', 'domain_name'), ('INSERT', 'UPDATE', 'DELETE')),
+}
+
+
+def upgrade() -> None:
+    # One notification per statement on the `row_change` channel:
+    # {"table": ..., "rows": [{<key column>: <value>, ...}, ...]}
+    # Statements changing too many rows for a notification send "rows": null,
+    # listeners then drop everything they hold from the table.
+    op.execute("""
+        CREATE FUNCTION notify_row_change() RETURNS trigger AS $$
+        DECLARE
+            changed jsonb;
+            payload text;
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                SELECT jsonb_agg(to_jsonb(r)) INTO changed
+                FROM (SELECT * FROM new_rows LIMIT 101) r;
+            ELSIF TG_OP = 'UPDATE' THEN
+                SELECT jsonb_agg(to_jsonb(r)) INTO changed
+                FROM (
+                    (SELECT * FROM old_rows LIMIT 101)
+                    UNION ALL
+                    (SELECT * FROM new_rows LIMIT 101)
+                ) r;
+            ELSE
+                SELECT jsonb_agg(to_jsonb(r)) INTO changed
+                FROM (SELECT * FROM old_rows LIMIT 101) r;
+            END IF;
+
+            IF changed IS NULL THEN
+                RETURN NULL;
+            END IF;
+
+            SELECT jsonb_agg(DISTINCT row_key) INTO changed
+            FROM (
+                SELECT (
+                    SELECT jsonb_object_agg(key_column, changed_row -> key_column)
+                    FROM unnest(TG_ARGV) AS key_column
+                ) AS row_key
+                FROM jsonb_array_elements(changed) AS changed_row
+            ) row_keys;
+
+            payload := jsonb_build_object('table', TG_TABLE_NAME, 'rows', changed)::text;
+            IF jsonb_array_length(changed) > 100 OR octet_length(payload) > 7900 THEN
+                payload := jsonb_build_object('table', TG_TABLE_NAME, 'rows', NULL)::text;
+            END IF;
+            PERFORM pg_notify('row_change', payload);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    for table, (key_columns, events) in TABLES.items():
+        arguments = ', '.join(f"'{column}'" for column in key_columns)
+        for event in events:
+            transition_tables = {
+                'INSERT': 'NEW TABLE AS new_rows',
+                'UPDATE': 'OLD TABLE AS old_rows NEW TABLE AS new_rows',
+                'DELETE': 'OLD TABLE AS old_rows',
+            }[event]
+            op.execute(f"""
+                CREATE TRIGGER {table}_notify_{event.lower()}
+                AFTER {event} ON {table}
+                REFERENCING {transition_tables}
+                FOR EACH STATEMENT EXECUTE FUNCTION notify_row_change({arguments});
+            """)
+
+
+def downgrade() -> None:
+    for table, (_, events) in TABLES.items():
+        for event in events:
+            op.execute(f'DROP TRIGGER {table}_notify_{event.lower()} ON {table};')
+    op.execute('DROP FUNCTION notify_row_change();')
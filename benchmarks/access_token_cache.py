@@ -0,0 +1,71 @@
+"""
+Requests per second of a single worker on a token protected endpoint, with and
+without the verified access token cache. No database or redis is needed:
+
+    python -m benchmarks.access_token_cache --requests 20000
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+
+from src.auth.config import auth_settings
+from src.auth.dependencies import access_token, valid_authenticated_user
+from src.auth.schemas import JWTData
+from src.auth.service import jwts
+
+app = FastAPI()
+
+
+@app.get("/protected")
+async def protected(jwt_data: JWTData = Depends(valid_authenticated_user)) -> int:
+    return jwt_data.user_id
+
+
+def decode_ops(token: str, operations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(operations):
+        access_token.decode_access_token(token)
+    return operations / (time.perf_counter() - started)
+
+
+async def requests_per_second(token: str, requests: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)  # type: ignore[arg-type]
+    cookies = {auth_settings.ACCESS_TOKEN_KEY: token}
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", cookies=cookies
+    ) as client:
+
+        async def _worker(count: int) -> None:
+            for _ in range(count):
+                response = await client.get("/protected")
+                assert response.status_code == 200, response.content
+
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(_worker(requests // concurrency) for _ in range(concurrency))
+        )
+        return requests / (time.perf_counter() - started)
+
+
+async def main(args: argparse.Namespace) -> None:
+    token = jwts.create_access_token(user_id="1")
+    cache = access_token.verified_tokens
+
+    for name, maxsize in (("without cache", 0), ("with cache", args.cache_size)):
+        cache.clear()
+        cache.maxsize = maxsize
+        ops = decode_ops(token, args.requests)
+        rps = await requests_per_second(token, args.requests, args.concurrency)
+        print(f"{name:>14}: {ops:10.0f} decodes/s {rps:8.0f} requests/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--cache-size", type=int, default=10_000)
+    asyncio.run(main(parser.parse_args()))
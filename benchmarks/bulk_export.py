@@ -0,0 +1,119 @@
+"""
+Peak RSS and duration of exporting `auth_user` with `fetch_all`, `stream`,
+`copy_out` and the admin XLSX export. The table is filled with a million users
+first, each export runs in its own process so that its peak RSS is measured
+alone:
+
+    python -m benchmarks.bulk_export --rows 1000000
+"""
+
+import argparse
+import asyncio
+import resource
+import subprocess
+import sys
+import time
+
+from psycopg_pool import AsyncConnectionPool
+
+from src import database
+from src.auth.models import AuthUserModel
+from src.auth.service import exports
+from src.config import settings
+
+EMAIL_DOMAIN = "export.benchmark.com"
+USERS = AuthUserModel.table_name()
+QUERY = f"SELECT {AuthUserModel.columns()} FROM {USERS} ORDER BY id;"
+MODES = ("baseline", "fetch_all", "stream", "copy_out", "xlsx")
+
+
+async def export(mode: str) -> int:
+    exported = 0
+    if mode == "fetch_all":
+        exported = len(await database.fetch_all(QUERY))
+    elif mode == "stream":
+        async for _ in database.stream(QUERY):
+            exported += 1
+    elif mode == "copy_out":
+        async for chunk in database.copy_out(QUERY):
+            exported += chunk.count(b"\n")
+        exported -= 1  # header
+    elif mode == "xlsx":
+        async for _ in exports.users_xlsx():
+            pass
+        row = await database.fetch_one(f"SELECT count(*) AS count FROM {USERS};")
+        exported = row["count"] if row else 0
+    return exported
+
+
+async def run_export(mode: str) -> None:
+    database.PG_POOL = AsyncConnectionPool(
+        settings.database.with_db(), min_size=1, open=False
+    )
+    await database.PG_POOL.open()
+    try:
+        started = time.perf_counter()
+        exported = await export(mode)
+        elapsed = time.perf_counter() - started
+    finally:
+        await database.PG_POOL.close()
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:>10}: {exported:8d} rows {elapsed:7.2f}s peak RSS {peak_rss:7.1f}MiB")
+
+
+async def seed(rows: int) -> None:
+    database.PG_POOL = AsyncConnectionPool(
+        settings.database.with_db(), min_size=1, open=False
+    )
+    await database.PG_POOL.open()
+    try:
+        await database.execute(
+            f"DELETE FROM {USERS} WHERE email LIKE %s;", (f"%@{EMAIL_DOMAIN}",)
+        )
+        await database.execute(
+            f"""
+            INSERT INTO {USERS} (email, password, created_at)
+            SELECT 'user' || g || '@{EMAIL_DOMAIN}', 'not-a-hash', now()
+            FROM generate_series(1, %s) g;
+            """,
+            (rows,),
+        )
+    finally:
+        await database.PG_POOL.close()
+
+
+async def cleanup() -> None:
+    database.PG_POOL = AsyncConnectionPool(
+        settings.database.with_db(), min_size=1, open=False
+    )
+    await database.PG_POOL.open()
+    try:
+        await database.execute(
+            f"DELETE FROM {USERS} WHERE email LIKE %s;", (f"%@{EMAIL_DOMAIN}",)
+        )
+    finally:
+        await database.PG_POOL.close()
+
+
+def main(args: argparse.Namespace) -> None:
+    if args.mode:
+        asyncio.run(run_export(args.mode))
+        return
+
+    asyncio.run(seed(args.rows))
+    try:
+        for mode in MODES:
+            subprocess.run(
+                [sys.executable, "-m", "benchmarks.bulk_export", "--mode", mode],
+                check=True,
+            )
+    finally:
+        asyncio.run(cleanup())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    main(parser.parse_args())
@@ -0,0 +1,41 @@
+"""
+Encode and decode operations per second of the access token codecs:
+
+    python -m benchmarks.jwt_codecs --operations 50000
+"""
+
+import argparse
+import time
+from typing import Any, Callable
+
+from src.auth.config import auth_settings
+from src.auth.service.codecs import create_codec
+
+
+def ops_per_second(operation: Callable[[], Any], operations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(operations):
+        operation()
+    return operations / (time.perf_counter() - started)
+
+
+def main(args: argparse.Namespace) -> None:
+    claims = {
+        "sub": "1",
+        "exp": int(time.time()) + auth_settings.JWT_EXP,
+        "is_admin": False,
+        "is_registered": True,
+    }
+
+    for name in ("jose", "fast"):
+        codec = create_codec(name, auth_settings.JWT_SECRET, auth_settings.JWT_ALG)
+        token = codec.encode(claims)
+        encodes = ops_per_second(lambda: codec.encode(claims), args.operations)
+        decodes = ops_per_second(lambda: codec.decode(token), args.operations)
+        print(f"{name:>5}: {encodes:10.0f} encodes/s {decodes:10.0f} decodes/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--operations", type=int, default=20_000)
+    main(parser.parse_args())
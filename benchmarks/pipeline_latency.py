@@ -0,0 +1,164 @@
+"""
+Latency of a multi statement flow sent one statement per round trip versus
+pipelined, through a local proxy adding a network delay in both directions:
+
+    python -m benchmarks.pipeline_latency --delay-ms 5 --flows 200
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable
+
+from psycopg_pool import AsyncConnectionPool
+
+from src import database, utils
+from src.auth.models import AuthRefreshTokenModel, AuthUserModel
+from src.auth.security import hash_refresh_token
+from src.config import settings
+
+EMAIL = "pipeline-latency@benchmark.com"
+TOKENS = AuthRefreshTokenModel.table_name()
+
+
+async def _pipe(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, delay: float
+) -> None:
+    """Forward every chunk `delay` seconds after it was received."""
+    loop = asyncio.get_running_loop()
+    chunks: asyncio.Queue[tuple[float, bytes]] = asyncio.Queue()
+
+    async def _send() -> None:
+        while True:
+            due, chunk = await chunks.get()
+            await asyncio.sleep(max(due - loop.time(), 0))
+            if not chunk:
+                break
+            writer.write(chunk)
+            await writer.drain()
+        writer.close()
+
+    sender = asyncio.create_task(_send())
+    try:
+        while chunk := await reader.read(65536):
+            chunks.put_nowait((loop.time() + delay, chunk))
+    except ConnectionError:
+        pass
+    chunks.put_nowait((loop.time() + delay, b""))
+    await sender
+
+
+async def start_delay_proxy(delay: float) -> tuple[asyncio.Server, int]:
+    async def _handle(
+        client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter
+    ) -> None:
+        server_reader, server_writer = await asyncio.open_connection(
+            settings.database.host, settings.database.port
+        )
+        await asyncio.gather(
+            _pipe(client_reader, server_writer, delay),
+            _pipe(server_reader, client_writer, delay),
+        )
+
+    server = await asyncio.start_server(_handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+def _statements(user_id: int, old_token: str) -> list[tuple[str, Any]]:
+    new_token = utils.generate_random_alphanum(64)
+    now = datetime.now()
+    return [
+        (
+            f"SELECT id, email FROM {AuthUserModel.table_name()} WHERE id = %s;",
+            (user_id,),
+        ),
+        (
+            f"""
+            INSERT INTO {TOKENS}
+                (uuid, refresh_token, refresh_token_digest, expires_at, user_id)
+            VALUES (%s, %s, %s, %s, %s);
+            """,
+            (
+                uuid.uuid4(),
+                new_token,
+                hash_refresh_token(new_token),
+                now + timedelta(days=1),
+                user_id,
+            ),
+        ),
+        (
+            f"UPDATE {TOKENS} SET expires_at = %s WHERE refresh_token_digest = %s;",
+            (now - timedelta(days=1), hash_refresh_token(old_token)),
+        ),
+    ]
+
+
+async def sequential(statements: list[tuple[str, Any]]) -> None:
+    for query, values in statements:
+        await database.execute(query, values)
+
+
+async def sequential_unit_of_work(statements: list[tuple[str, Any]]) -> None:
+    async with database.unit_of_work(transaction=True):
+        for query, values in statements:
+            await database.execute(query, values)
+
+
+async def pipelined(statements: list[tuple[str, Any]]) -> None:
+    await database.fetch_many(statements)
+
+
+async def measure(
+    name: str,
+    flow: Callable[[list[tuple[str, Any]]], Awaitable[None]],
+    user_id: int,
+    flows: int,
+) -> None:
+    started = time.perf_counter()
+    for _ in range(flows):
+        await flow(_statements(user_id, "expired"))
+    elapsed = time.perf_counter() - started
+    print(f"{name:>24}: {elapsed / flows * 1000:7.2f}ms/flow")
+
+
+async def main(args: argparse.Namespace) -> None:
+    proxy, port = await start_delay_proxy(args.delay_ms / 1000)
+    conninfo = settings.database.with_db().replace(
+        f"{settings.database.host}:{settings.database.port}", f"127.0.0.1:{port}"
+    )
+    database.PG_POOL = AsyncConnectionPool(conninfo, min_size=1, open=False)
+    await database.PG_POOL.open()
+    await database.PG_POOL.wait()
+
+    try:
+        await database.execute(
+            f"DELETE FROM {AuthUserModel.table_name()} WHERE email = %s;", (EMAIL,)
+        )
+        user = await database.fetch_one(
+            f"""
+            INSERT INTO {AuthUserModel.table_name()} (email, created_at)
+            VALUES (%s, now()) RETURNING id;
+            """,
+            (EMAIL,),
+        )
+        assert user
+
+        print(f"{args.delay_ms}ms one-way delay, 3 statements per flow")
+        await measure("one statement per await", sequential, user["id"], args.flows)
+        await measure("unit of work", sequential_unit_of_work, user["id"], args.flows)
+        await measure("pipeline", pipelined, user["id"], args.flows)
+    finally:
+        await database.execute(
+            f"DELETE FROM {AuthUserModel.table_name()} WHERE email = %s;", (EMAIL,)
+        )
+        await database.PG_POOL.close()
+        proxy.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--delay-ms", type=float, default=5.0)
+    parser.add_argument("--flows", type=int, default=100)
+    asyncio.run(main(parser.parse_args()))
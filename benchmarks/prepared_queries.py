@@ -0,0 +1,73 @@
+"""
+Planning time and throughput of the registered read-only queries, executed as
+plain statements and as prepared statements. Needs a migrated database:
+
+    python -m benchmarks.prepared_queries --executions 5000
+"""
+
+import argparse
+import asyncio
+import re
+import time
+from typing import Any
+
+import psycopg
+from psycopg.types.numeric import Int8Dumper
+
+from src import database
+from src.auth.service import queries  # noqa: F401, registers the auth queries
+from src.config import settings
+
+
+async def planning_time(
+    conn: psycopg.AsyncConnection[Any], query: database.Query
+) -> float:
+    cur = psycopg.AsyncClientCursor(conn)
+    await cur.execute(f"EXPLAIN (SUMMARY) {query.sql}", query.warmup)
+    plan = "\n".join(row[0] for row in await cur.fetchall())
+    match = re.search(r"Planning Time: ([\d.]+) ms", plan)
+    return float(match.group(1)) if match else 0.0
+
+
+async def executions_per_second(
+    conn: psycopg.AsyncConnection[Any],
+    query: database.Query,
+    executions: int,
+    prepare: bool,
+) -> float:
+    started = time.perf_counter()
+    for _ in range(executions):
+        cur = await conn.execute(query.sql, query.warmup, prepare=prepare)
+        await cur.fetchall()
+    return executions / (time.perf_counter() - started)
+
+
+async def main(args: argparse.Namespace) -> None:
+    conn = await psycopg.AsyncConnection.connect(
+        settings.database.with_db(), autocommit=True
+    )
+    conn.adapters.register_dumper(int, Int8Dumper)
+
+    async with conn:
+        for query in database.queries.values():
+            if query.warmup is None:
+                continue
+
+            planning = await planning_time(conn, query)
+            plain = await executions_per_second(
+                conn, query, args.executions, prepare=False
+            )
+            prepared = await executions_per_second(
+                conn, query, args.executions, prepare=True
+            )
+            print(
+                f"{query.name:>32}: planning {planning:.3f}ms, "
+                f"{plain:8.0f} plain/s, {prepared:8.0f} prepared/s "
+                f"({prepared / plain:.2f}x)"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--executions", type=int, default=2000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,66 @@
+"""
+Redis operations per second and connection waits of concurrent requests, with
+the plain client and with the auto-pipelining client, on the same blocking pool
+of `REDIS_MAX_CONNECTIONS` connections. Needs redis:
+
+    python -m benchmarks.redis_pipelining --concurrency 200 --operations 50000
+"""
+
+import argparse
+import asyncio
+import time
+
+from redis.asyncio import Redis
+
+from src import caching
+from src.config import settings
+
+KEY_PREFIX = "benchmark:pipelining"
+
+
+async def request(client: Redis, worker: int, operations: int) -> None:
+    for i in range(operations):
+        key = f"{KEY_PREFIX}:{worker}:{i % 10}"
+        if i % 2:
+            await client.get(key)
+        else:
+            await client.set(key, i, ex=60)
+
+
+async def measure(
+    name: str, client_class: type[Redis], args: argparse.Namespace
+) -> None:
+    pool = caching.MeteredConnectionPool.from_url(
+        str(settings.REDIS_URL),
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=None,
+        decode_responses=True,
+    )
+    client = client_class(connection_pool=pool)
+    per_worker = args.operations // args.concurrency
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(request(client, worker, per_worker) for worker in range(args.concurrency))
+        )
+        elapsed = time.perf_counter() - started
+    finally:
+        await pool.disconnect()
+
+    operations = per_worker * args.concurrency
+    print(
+        f"{name:>14}: {operations / elapsed:9.0f} ops/s "
+        f"{pool.waits:7d} connection waits {pool.wait_seconds:7.2f}s waiting"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    await measure("plain", Redis, args)
+    await measure("auto-pipeline", caching.AutoPipelineRedis, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--operations", type=int, default=50_000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,84 @@
+"""
+Pool checkouts and latency per refresh token rotation.
+
+Compares the former `PUT /auth/token` flow (lookup token, load user, insert the
+new token, expire the old one) with the single statement rotation:
+
+    python -m benchmarks.refresh_rotation --rotations 2000
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable
+
+from psycopg_pool import AsyncConnectionPool
+
+from src import database
+from src.auth import service
+from src.auth.schemas import AuthUser
+from src.config import settings
+
+EMAIL = "refresh-rotation@benchmark.com"
+
+
+async def legacy_rotation(refresh_token: str) -> str:
+    db_refresh_token = await service.get_refresh_token(refresh_token)
+    assert db_refresh_token
+    user = await service.get_user_by_id(db_refresh_token.user_id)
+    assert user
+    new_refresh_token = await service.create_refresh_token(user_id=user.id)
+    await service.expire_refresh_token(db_refresh_token.uuid)
+    return new_refresh_token
+
+
+async def single_statement_rotation(refresh_token: str) -> str:
+    rotated = await service.rotate_refresh_token(refresh_token)
+    assert rotated
+    return rotated[1]
+
+
+async def measure(
+    name: str, rotate: Callable[[str], Awaitable[str]], user_id: int, rotations: int
+) -> None:
+    refresh_token = await service.create_refresh_token(user_id=user_id)
+    requests_before = database.PG_POOL.get_stats()["requests_num"]
+    started = time.perf_counter()
+
+    for _ in range(rotations):
+        refresh_token = await rotate(refresh_token)
+
+    elapsed = time.perf_counter() - started
+    checkouts = database.PG_POOL.get_stats()["requests_num"] - requests_before
+    print(
+        f"{name:>16}: {checkouts / rotations:.2f} connections/refresh, "
+        f"{elapsed / rotations * 1000:.3f}ms/refresh, "
+        f"{rotations / elapsed:.0f} refresh/s"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    database.PG_POOL = AsyncConnectionPool(settings.database.with_db(), open=False)
+    await database.PG_POOL.open()
+
+    try:
+        await service.delete_user(EMAIL)
+        await service.create_user_with_password(
+            AuthUser(email=EMAIL, password="Bench1!mark")
+        )
+        user = await service.get_user_by_email(EMAIL)
+        assert user
+
+        await measure("legacy", legacy_rotation, user.id, args.rotations)
+        await measure(
+            "single statement", single_statement_rotation, user.id, args.rotations
+        )
+    finally:
+        await service.delete_user(EMAIL)
+        await database.PG_POOL.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rotations", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
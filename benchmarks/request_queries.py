@@ -0,0 +1,144 @@
+"""
+Database queries per request for a route resolving the same refresh token and
+user through several dependencies, as `refresh_access_token` does:
+
+    python -m benchmarks.request_queries --users 200 --concurrency 50
+
+The user cache tiers are bypassed, so every user lookup reaches the loader.
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+import redis.asyncio as aioredis
+from fastapi import Depends, FastAPI
+from psycopg_pool import AsyncConnectionPool
+
+from src import caching, database, loaders
+from src.auth import service
+from src.auth.config import auth_settings
+from src.auth.dependencies.refresh_token import (
+    valid_refresh_token,
+    valid_refresh_token_user,
+    valid_refresh_token_user_token,
+)
+from src.auth.models import AuthRefreshTokenModel, AuthUserModel
+from src.config import settings
+
+EMAIL_DOMAIN = "request-queries.benchmark.com"
+
+
+async def profile(
+    _: AuthRefreshTokenModel = Depends(valid_refresh_token),
+    user: AuthUserModel = Depends(valid_refresh_token_user),
+    user_token: tuple[AuthUserModel, AuthRefreshTokenModel] = Depends(
+        valid_refresh_token_user_token
+    ),
+) -> int:
+    return user.id
+
+
+def create_app(identity_map: bool) -> FastAPI:
+    app = FastAPI()
+    app.get("/profile")(profile)
+    if identity_map:
+        app.add_middleware(loaders.IdentityMapMiddleware)
+    return app
+
+
+async def _no_cached_user(_: str) -> None:
+    return None
+
+
+async def create_users(count: int) -> list[str]:
+    rows = await database.fetch_all(
+        f"""
+        INSERT INTO {AuthUserModel.table_name()} (email, password, created_at)
+        SELECT 'user' || n || '@{EMAIL_DOMAIN}', NULL, now()
+        FROM generate_series(1, %s) n
+        RETURNING id;
+        """,
+        (count,),
+    )
+    return [await service.create_refresh_token(user_id=row["id"]) for row in rows]
+
+
+async def measure(
+    name: str, app: FastAPI, refresh_tokens: list[str], requests: int, concurrency: int
+) -> None:
+    transport = httpx.ASGITransport(app=app)  # type: ignore[arg-type]
+    queries_before = database.PG_POOL.get_stats()["requests_num"]
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+
+        async def _worker(worker: int) -> None:
+            for n in range(worker, requests, concurrency):
+                token = refresh_tokens[n % len(refresh_tokens)]
+                response = await client.get(
+                    "/profile",
+                    headers={"Cookie": f"{auth_settings.REFRESH_TOKEN_KEY}={token}"},
+                )
+                assert response.status_code == 200, response.content
+
+        started = time.perf_counter()
+        await asyncio.gather(*(_worker(worker) for worker in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    queries = database.PG_POOL.get_stats()["requests_num"] - queries_before
+    print(
+        f"{name:>22}: {queries / requests:.2f} queries/request, "
+        f"{requests / elapsed:.0f} requests/s"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    database.PG_POOL = AsyncConnectionPool(
+        settings.database.with_db(), max_size=args.concurrency, open=False
+    )
+    await database.PG_POOL.open()
+    caching.redis_client = aioredis.Redis.from_url(
+        str(settings.REDIS_URL), decode_responses=True
+    )
+    service.core._get_cached_user = _no_cached_user  # type: ignore[assignment]
+
+    delete_users = f"DELETE FROM {AuthUserModel.table_name()} WHERE email LIKE %s;"
+    try:
+        await database.execute(delete_users, (f"%@{EMAIL_DOMAIN}",))
+        tokens = await create_users(args.users)
+        loader = service.core.user_loader
+
+        loader.max_batch_size = 1
+        await measure(
+            "no identity map",
+            create_app(False),
+            tokens,
+            args.requests,
+            args.concurrency,
+        )
+        await measure(
+            "identity map", create_app(True), tokens, args.requests, args.concurrency
+        )
+        loader.max_batch_size = 1000
+        await measure(
+            "identity map + loader",
+            create_app(True),
+            tokens,
+            args.requests,
+            args.concurrency,
+        )
+    finally:
+        await database.execute(delete_users, (f"%@{EMAIL_DOMAIN}",))
+        await database.PG_POOL.close()
+        await caching.redis_client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
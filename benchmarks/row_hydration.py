@@ -0,0 +1,92 @@
+"""
+Rows per second and bytes per object when turning database rows into models,
+with pydantic validation and with the trusted row path. No database is needed,
+the rows are built the way psycopg returns them:
+
+    python -m benchmarks.row_hydration --rows 50000
+"""
+
+import argparse
+import datetime
+import time
+import tracemalloc
+import uuid
+from typing import Any, Callable
+
+from src.auth.models import AuthRefreshTokenModel, AuthUserModel
+from src.auth.schemas import BaseUser
+
+
+def user_rows(count: int) -> list[dict[str, Any]]:
+    now = datetime.datetime.now()
+    return [
+        {
+            "id": i,
+            "email": f"user{i}@benchmark.com",
+            "password": None,
+            "domain_information": None,
+            "role": 1,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(count)
+    ]
+
+
+def refresh_token_rows(count: int) -> list[dict[str, Any]]:
+    now = datetime.datetime.now()
+    return [
+        {
+            "uuid": uuid.uuid4(),
+            "user_id": i,
+            "refresh_token": "x" * 64,
+            "expires_at": now,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(count)
+    ]
+
+
+def measure(
+    name: str, build: Callable[[dict[str, Any]], Any], rows: list[dict[str, Any]]
+) -> None:
+    started = time.perf_counter()
+    for row in rows:
+        build(row)
+    rows_per_second = len(rows) / (time.perf_counter() - started)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [build(row) for row in rows]
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    print(
+        f"{name:>28}: {rows_per_second:10.0f} rows/s "
+        f"{allocated / len(objects):6.0f} bytes/object"
+    )
+
+
+def main(args: argparse.Namespace) -> None:
+    users = user_rows(args.rows)
+    tokens = refresh_token_rows(args.rows)
+
+    measure("user, validated", lambda row: AuthUserModel(**row), users)
+    measure("user, trusted", AuthUserModel.from_row, users)
+    measure(
+        "refresh token, validated", lambda row: AuthRefreshTokenModel(**row), tokens
+    )
+    measure("refresh token, trusted", AuthRefreshTokenModel.from_row, tokens)
+    measure("base user, validated", lambda row: BaseUser(email=row["email"]), users)
+    measure(
+        "base user, constructed",
+        lambda row: BaseUser.model_construct(email=row["email"]),
+        users,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20_000)
+    main(parser.parse_args())
@@ -0,0 +1,87 @@
+"""
+Node memory of a domain registry held by every worker, and shared through a
+snapshot in `/dev/shm`, as the worker count grows. Memory is the proportional
+set size (PSS) the registry adds to each worker, shared pages are split between
+the workers mapping them. No database is needed:
+
+    python -m benchmarks.shared_snapshot --domains 200000 --workers 1 4 16
+"""
+
+import argparse
+import multiprocessing
+import tempfile
+import time
+from multiprocessing.synchronize import Barrier
+from typing import Any
+
+from src.snapshots import SharedStringSet
+
+
+def domain_names(count: int) -> list[str]:
+    return [f"tenant-{i}.example.com" for i in range(count)]
+
+
+def pss() -> int:
+    with open("/proc/self/smaps_rollup") as smaps:
+        for line in smaps:
+            if line.startswith("Pss:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def worker(
+    mode: str, directory: str, count: int, barrier: Barrier, results: Any
+) -> None:
+    before = pss()
+    if mode == "private":
+        registry: Any = set(domain_names(count))
+    else:
+        registry = SharedStringSet(directory, "domains")
+
+    started = time.perf_counter()
+    names = domain_names(count)
+    assert all(name in registry for name in names)
+    lookups_per_second = count / (time.perf_counter() - started)
+    del names
+
+    # Measured while every worker holds the registry
+    barrier.wait()
+    results.put((pss() - before, lookups_per_second))
+    barrier.wait()
+
+
+def measure(mode: str, directory: str, count: int, workers: int) -> None:
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(mode, directory, count, barrier, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    measured = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    node_memory = sum(memory for memory, _ in measured)
+    lookups = sum(rate for _, rate in measured) / workers
+    print(
+        f"{mode:>8} {workers:3d} workers: {node_memory / 2**20:8.1f}MiB per node "
+        f"{lookups:10.0f} lookups/s per worker"
+    )
+
+
+def main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory(dir="/dev/shm") as directory:
+        SharedStringSet(directory, "domains").publish(domain_names(args.domains))
+        for workers in args.workers:
+            measure("private", directory, args.domains, workers)
+            measure("shared", directory, args.domains, workers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--domains", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    main(parser.parse_args())
@@ -0,0 +1,90 @@
+"""
+Latency of non-auth endpoints while the worker is flooded with signins.
+
+Run against a live application (single worker makes the effect obvious):
+
+    uvicorn src.main:app --workers 1
+    python -m benchmarks.signin_storm --url http://127.0.0.1:8000
+
+Compare `PASSWORD_HASHER_WORKERS=0` (thread pool) and `PASSWORD_HASHER_WORKERS=2`
+(process pool) with the numbers of the inline hashing baseline.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+EMAIL = "signin-storm@benchmark.com"
+PASSWORD = "Bench1!mark"
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def signin_storm(
+    client: httpx.AsyncClient, concurrency: int, stop: asyncio.Event
+) -> int:
+    signins = 0
+
+    async def _worker() -> None:
+        nonlocal signins
+        while not stop.is_set():
+            await client.post(
+                "/auth/signin", json={"email": EMAIL, "password": PASSWORD}
+            )
+            signins += 1
+
+    await asyncio.gather(*(_worker() for _ in range(concurrency)))
+    return signins
+
+
+async def probe(
+    client: httpx.AsyncClient, path: str, duration: float, interval: float
+) -> list[float]:
+    latencies: list[float] = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await client.get(path)
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def main(args: argparse.Namespace) -> None:
+    limits = httpx.Limits(max_connections=args.concurrency + 1)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits) as client:
+        await client.post("/auth/signup", json={"email": EMAIL, "password": PASSWORD})
+
+        idle = await probe(client, args.path, args.duration / 3, args.interval)
+
+        stop = asyncio.Event()
+        storm = asyncio.create_task(signin_storm(client, args.concurrency, stop))
+        loaded = await probe(client, args.path, args.duration, args.interval)
+        stop.set()
+        signins = await storm
+
+    for name, samples in (("idle", idle), ("signin storm", loaded)):
+        print(
+            f"{name:>13}: n={len(samples):<5} "
+            f"p50={statistics.median(samples):7.2f}ms "
+            f"p99={percentile(samples, 99):7.2f}ms "
+            f"max={max(samples):7.2f}ms"
+        )
+    print(f"signins/s during storm: {signins / args.duration:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", default="/healthcheck")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--interval", type=float, default=0.01)
+    asyncio.run(main(parser.parse_args()))
@@ -26,6 +26,17 @@ else:
         use_max_workers = int(max_workers_str)
         web_concurrency = min(web_concurrency, use_max_workers)
 
+# Every worker owns a separate password hashing pool, share the cores between them
+password_hasher_workers_str = os.getenv("PASSWORD_HASHER_WORKERS", None)
+if password_hasher_workers_str:
+    password_hasher_workers = int(password_hasher_workers_str)
+    assert password_hasher_workers >= 0
+else:
+    password_hasher_workers = max(cores // web_concurrency, 1)
+
+# Read-mostly data is shared by the workers through files in the tmpfs
+snapshot_dir = os.getenv("SNAPSHOT_DIR", "/dev/shm")
+
 graceful_timeout_str = os.getenv("GRACEFUL_TIMEOUT", "120")
 timeout_str = os.getenv("TIMEOUT", "120")
 keepalive_str = os.getenv("KEEP_ALIVE", "5")
@@ -39,4 +50,8 @@ worker_tmp_dir = "/dev/shm"
 graceful_timeout = int(graceful_timeout_str)
 timeout = int(timeout_str)
 keepalive = int(keepalive_str)
+raw_env = [
+    f"PASSWORD_HASHER_WORKERS={password_hasher_workers}",
+    f"SNAPSHOT_DIR={snapshot_dir}",
+]
 logconfig = os.getenv("LOG_CONFIG", "/src/logging_production.ini")
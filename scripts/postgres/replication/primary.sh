@@ -0,0 +1,4 @@
+#!/bin/sh -e
+
+# Runs once, when the primary data directory is initialised
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
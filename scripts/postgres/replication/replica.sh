@@ -0,0 +1,16 @@
+#!/bin/sh -e
+
+# Clone the primary into an empty data directory, then start as a hot standby
+if [ ! -s "$PGDATA/PG_VERSION" ]; then
+    until pg_isready -h app_db -U "$POSTGRES_USER"; do
+        sleep 1
+    done
+
+    mkdir -p "$PGDATA"
+    chown postgres:postgres "$PGDATA"
+    chmod 700 "$PGDATA"
+    PGPASSWORD="$POSTGRES_PASSWORD" gosu postgres \
+        pg_basebackup -h app_db -U "$POSTGRES_USER" -D "$PGDATA" -R -X stream
+fi
+
+exec docker-entrypoint.sh postgres
@@ -0,0 +1,59 @@
+"""
+Administrative commands, run next to the application:
+
+    python -m src.auth.cli import-users users.xlsx --workers 8
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from psycopg_pool import AsyncConnectionPool
+
+from src import database
+from src.auth import service
+from src.config import settings
+
+
+async def import_users(args: argparse.Namespace) -> None:
+    executor = ProcessPoolExecutor(
+        max_workers=args.workers, mp_context=multiprocessing.get_context("fork")
+    )
+    # Fork the hashing processes before any connection is opened
+    await asyncio.get_running_loop().run_in_executor(executor, int)
+    database.PG_POOL = AsyncConnectionPool(
+        settings.database.with_db(), min_size=1, open=False
+    )
+    await database.PG_POOL.open()
+    try:
+        with open(args.file, "rb") as file:
+            result = await service.imports.import_users(
+                file,
+                args.file,
+                executor=executor,
+                concurrency=args.workers,
+                batch_size=args.batch_size,
+            )
+    finally:
+        await database.PG_POOL.close()
+        executor.shutdown()
+
+    print(result.model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(required=True)
+
+    import_parser = commands.add_parser(
+        "import-users", help="Create the users of a CSV or XLSX file"
+    )
+    import_parser.add_argument("file")
+    import_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    import_parser.add_argument("--batch-size", type=int, default=None)
+    import_parser.set_defaults(command=import_users)
+
+    args = parser.parse_args()
+    asyncio.run(args.command(args))
@@ -1,3 +1,5 @@
+from typing import Literal
+
 import argon2
 from fastapi_sso import GoogleSSO
 from pydantic_settings import BaseSettings
@@ -7,20 +9,43 @@ class AuthConfig(BaseSettings):
     JWT_ALG: str
     JWT_SECRET: str
     JWT_EXP: int = 60 * 5  # 5 minutes
+    JWT_CODEC: Literal["jose", "fast"] = "fast"
+    JWT_KEYS_DIR: str | None = None  # <kid>.pem keys for RS*, ES* and EdDSA
+    JWT_KEY_ID: str | None = None  # kid signing new tokens, the others only verify
+    JWKS_MAX_AGE: int = 60 * 60  # 1 hour
 
     ACCESS_TOKEN_KEY: str = "accessToken"
     ACCESS_TOKEN_EXP: int = 60 * 15  # 15 minutes
+    ACCESS_TOKEN_CACHE_SIZE: int = 10_000  # verified tokens per worker, 0 disables
 
     REFRESH_TOKEN_KEY: str = "refreshToken"
     REFRESH_TOKEN_EXP: int = 60 * 60 * 24 * 21  # 21 days
+    REFRESH_TOKEN_REAPER_INTERVAL: int = 60 * 10  # 10 minutes
+    REFRESH_TOKEN_REAPER_BATCH_SIZE: int = 1000
+    REFRESH_TOKEN_REAPER_GRACE: int = 60 * 60 * 24  # keep expired tokens for a day
+    REFRESH_TOKEN_PARTITIONED: bool = False  # see scripts/postgres/partition_tokens
 
     SECURE_COOKIES: bool = True
 
+    USER_CACHE_SIZE: int = 10_000
+    USER_CACHE_LOCAL_TTL: int = 30  # seconds in worker memory
+    USER_CACHE_TTL: int = 60 * 5  # seconds in redis
+
+    DOMAIN_REGISTRY_REFRESH_INTERVAL: int = 30  # seconds between incremental loads
+    DOMAIN_REGISTRY_RELOAD_INTERVAL: int = 60 * 10  # seconds between full loads
+    DOMAIN_NEGATIVE_CACHE_SIZE: int = 10_000
+    DOMAIN_NEGATIVE_CACHE_TTL: int = 60  # seconds
+
     GOOGLE_CLIENT_ID: str
     GOOGLE_CLIENT_SECRET: str
     GOOGLE_REDIRECT_URI: str
 
     password_hasher: argon2.PasswordHasher = argon2.PasswordHasher()
+    PASSWORD_HASHER_WORKERS: int = 1  # 0 runs hashing in the default thread pool
+    PASSWORD_HASHER_QUEUE_SIZE: int = 64
+    PASSWORD_HASHER_CHUNK_SIZE: int = 16  # passwords per task of a bulk import
+
+    USER_IMPORT_BATCH_SIZE: int = 5000  # rows copied and merged at once
 
 
 auth_settings = AuthConfig()  # type: ignore
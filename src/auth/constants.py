@@ -7,3 +7,5 @@ class ErrorCode:
     REFRESH_TOKEN_NOT_VALID = "Refresh token is not valid."
     REFRESH_TOKEN_REQUIRED = "Refresh token is required either in the body or cookie."
     DOMAIN_IS_NOT_SUPPORTED = "Domain name is not found in registered domains."
+    PASSWORD_HASHER_BUSY = "Too many authentication attempts, try again later."
+    IMPORT_FILE_NOT_VALID = "Import a CSV or XLSX file with an email column."
@@ -4,7 +4,7 @@ from src.auth.dependencies.access_token import *
 from src.auth.dependencies.refresh_token import *
 
 __all__ = [
-    "email_not_taken",
+    "rotated_refresh_token",
     "valid_admin_user",
     "valid_authenticated_user",
     "valid_refresh_token",
@@ -1,22 +1,34 @@
+import time
 from typing import Any
 
 from fastapi import Depends, Request
-from jose import JWTError, jwt
 
+from src import caching
 from src.auth.config import auth_settings
-from src.auth.exceptions import (
-    InvalidToken,
-)
 from src.auth.schemas import JWTData
+from src.auth.service import jwts
+
+# Payloads of tokens whose signature is already checked, evicted at their `exp`.
+# Keyed by the whole token, so a tampered token is always a miss.
+verified_tokens: caching.LocalCache[dict[str, Any]] = caching.LocalCache(
+    "access_token",
+    maxsize=auth_settings.ACCESS_TOKEN_CACHE_SIZE,
+    ttl=auth_settings.ACCESS_TOKEN_EXP,
+)
 
 
 def decode_access_token(token: str) -> Any:
-    try:
-        return jwt.decode(
-            token, auth_settings.JWT_SECRET, algorithms=[auth_settings.JWT_ALG]
-        )
-    except JWTError:
-        raise InvalidToken()
+    payload = verified_tokens.get(token)
+    if payload is not None and payload["exp"] > time.time():
+        return payload
+
+    payload = jwts.decode_access_token(token)
+
+    if isinstance(payload.get("exp"), int | float):
+        ttl = payload["exp"] - time.time()
+        if ttl > 0:
+            verified_tokens.set(token, payload, ttl=ttl)
+    return payload
 
 
 async def retrieve_access_token_from_cookies(request: Request) -> str | None:
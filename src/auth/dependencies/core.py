@@ -1,11 +1,10 @@
 from fastapi import Depends, Request, Response
 
-from src.auth import schemas, service
+from src.auth import service
 from src.auth.exceptions import (
     AuthorizationFailed,
     AuthRequired,
     DomainError,
-    EmailTaken,
     RefreshTokenNotValid,
 )
 from src.auth.schemas import DomainNameValidator, JWTData
@@ -18,6 +17,13 @@ from .access_token import (
 from .refresh_token import valid_refresh_token
 
 
+async def _claims_are_current(jwt_data: JWTData) -> bool:
+    """Claims are stale once the user's role changed or the user got deleted."""
+    if jwt_data.version is None:
+        return False
+    return jwt_data.version == await service.versions.get_user_version(jwt_data.user_id)
+
+
 async def _parse_tokens(
     response: Response,
     tokens: tuple[str | None, str | None] = Depends(retrieve_auth_tokens),
@@ -27,7 +33,11 @@ async def _parse_tokens(
         raise AuthRequired()
 
     if access_token:
-        return await parse_access_token(access_token)
+        jwt_data = await parse_access_token(access_token)
+        if jwt_data and await _claims_are_current(jwt_data):
+            return jwt_data
+        if not refresh_token:
+            raise AuthRequired()
 
     if refresh_token:
         try:
@@ -35,14 +45,10 @@ async def _parse_tokens(
         except RefreshTokenNotValid:
             raise AuthRequired()
 
-        user = await service.get_user_by_id(_token.user_id)
-
-        if not user:
+        new_access_token = await service.jwts.issue_user_access_token(_token.user_id)
+        if not new_access_token:
             raise AuthRequired()
 
-        new_access_token = service.jwts.create_access_token(
-            user_id=user.id, is_admin=user.is_admin
-        )
         response.set_cookie(
             **service.token.get_access_token_settings(new_access_token).data
         )
@@ -52,13 +58,6 @@ async def _parse_tokens(
     return JWTData(**payload)
 
 
-async def email_not_taken(user: schemas.AuthUser) -> schemas.AuthUser:
-    if await service.get_user_by_email(user.email):
-        raise EmailTaken()
-
-    return user
-
-
 async def valid_authenticated_user(
     access_token: JWTData | None = Depends(_parse_tokens),
 ) -> JWTData:
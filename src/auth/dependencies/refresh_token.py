@@ -32,6 +32,16 @@ async def valid_refresh_token(
     return db_refresh_token
 
 
+async def rotated_refresh_token(
+    refresh_token: str = Cookie(..., alias=auth_settings.REFRESH_TOKEN_KEY),
+) -> tuple[AuthUserModel, str]:
+    rotated = await service.rotate_refresh_token(refresh_token)
+    if not rotated:
+        raise RefreshTokenNotValid()
+
+    return rotated
+
+
 async def valid_refresh_token_user(
     refresh_token: AuthRefreshTokenModel = Depends(valid_refresh_token),
 ) -> AuthUserModel:
@@ -60,9 +70,10 @@ async def refresh_access_token(
     if access_token:
         return access_token
 
-    access_token_value = service.jwts.create_access_token(
-        user_id=user.id, is_admin=user.is_admin
-    )
+    access_token_value = await service.jwts.issue_user_access_token(user.id)
+    if not access_token_value:
+        raise RefreshTokenNotValid()
+
     response.set_cookie(
         **service.token.get_access_token_settings(access_token_value).data
     )
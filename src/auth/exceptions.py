@@ -1,5 +1,10 @@
 from src.auth.constants import ErrorCode
-from src.exceptions import BadRequest, NotAuthenticated, PermissionDenied
+from src.exceptions import (
+    BadRequest,
+    NotAuthenticated,
+    PermissionDenied,
+    ServiceUnavailable,
+)
 
 
 class AuthRequired(NotAuthenticated):
@@ -28,3 +33,11 @@ class RefreshTokenNotValid(NotAuthenticated):
 
 class DomainError(BadRequest):
     DETAIL = ErrorCode.DOMAIN_IS_NOT_SUPPORTED
+
+
+class PasswordHasherBusy(ServiceUnavailable):
+    DETAIL = ErrorCode.PASSWORD_HASHER_BUSY
+
+
+class ImportFileNotValid(BadRequest):
+    DETAIL = ErrorCode.IMPORT_FILE_NOT_VALID
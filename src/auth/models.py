@@ -3,7 +3,7 @@ import enum
 from typing import Optional
 from uuid import UUID as uuid_type
 
-from sqlalchemy import ForeignKey, types
+from sqlalchemy import ForeignKey, Index, func, types
 from sqlalchemy.orm import Mapped as M
 from sqlalchemy.orm import mapped_column
 from sqlalchemy.sql import text
@@ -39,6 +39,10 @@ class AuthUserModel(BaseModel):
         return self.role == UserRoles.ADMIN.value
 
 
+# Emails are unique regardless of their case, lookups and signups go through it
+Index("auth_user_email_lower_key", func.lower(AuthUserModel.email), unique=True)
+
+
 class AuthRefreshTokenModel(BaseModel):
     __tablename__ = "auth_refresh_token"
 
@@ -47,9 +51,22 @@ class AuthRefreshTokenModel(BaseModel):
         ForeignKey("auth_user.id", ondelete="CASCADE"), nullable=False
     )
     refresh_token: M[str] = mapped_column(nullable=False)
+    refresh_token_digest: M[bytes] = mapped_column(
+        types.LargeBinary(32), nullable=False, init=False
+    )
     expires_at: M[datetime.datetime] = mapped_column(nullable=False)
 
 
+# Refresh tokens are looked up by the digest of the token they were given
+Index(
+    "auth_refresh_token_refresh_token_digest_idx",
+    AuthRefreshTokenModel.refresh_token_digest,
+    unique=True,
+)
+# Expired tokens are reaped through it
+Index("auth_refresh_token_expires_at_idx", AuthRefreshTokenModel.expires_at)
+
+
 class SubscriptionType(enum.Enum):
     BASIC = 1
 
@@ -61,3 +78,7 @@ class DomainInformationModel(BaseModel):
     domain_name: M[Fields.STR_255] = mapped_column(nullable=False)
     subscription_type: M[int] = mapped_column(nullable=False)
     is_paid: M[bool] = mapped_column(nullable=False, default=False)
+
+
+# Domain checks of the requests not served by the registry go through it
+Index("domain_information_domain_name_idx", DomainInformationModel.domain_name)
@@ -1,44 +1,66 @@
+from datetime import date
+from typing import Literal
+
 import fastapi_sso
 from fastapi import (
     APIRouter,
-    BackgroundTasks,
     Depends,
-    HTTPException,
+    Query,
     Request,
     Response,
+    UploadFile,
     status,
 )
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, StreamingResponse
 
+from src import database
 from src.auth import service
-from src.auth.config import google_sso
+from src.auth.config import auth_settings, google_sso
 from src.auth.dependencies import (
-    email_not_taken,
+    rotated_refresh_token,
     valid_admin_user,
     valid_authenticated_user,
     valid_refresh_token,
-    valid_refresh_token_user,
 )
+from src.auth.exceptions import EmailTaken, InvalidCredentials, RefreshTokenNotValid
 from src.auth.models import AuthRefreshTokenModel, AuthUserModel
 from src.auth.schemas import (
     AccessTokenResponse,
     AuthUser,
     BaseUser,
     JWTData,
+    UserImportResult,
 )
 from src.exceptions import BadRequest, DetailedHTTPException
 
 router = APIRouter(prefix="/auth")
+well_known_router = APIRouter(prefix="/.well-known")
+
+
+@well_known_router.get("/jwks.json", response_class=Response)
+async def get_jwks(request: Request) -> Response:
+    """Public keys verifying the access tokens, for the other services."""
+    key_ring = service.jwts.key_ring
+    headers = {
+        "Cache-Control": f"public, max-age={auth_settings.JWKS_MAX_AGE}",
+        "ETag": key_ring.jwks_etag,
+    }
+    if request.headers.get("if-none-match") == key_ring.jwks_etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(key_ring.jwks, media_type="application/json", headers=headers)
 
 
 @router.get("/me", response_model=BaseUser)
 async def get_my_account(
     jwt_data: JWTData = Depends(valid_authenticated_user),
 ) -> BaseUser:
+    if jwt_data.email:
+        return BaseUser(email=jwt_data.email)
+
     user = await service.get_user_by_id(jwt_data.user_id)
     if not user:
         raise DetailedHTTPException
-    return BaseUser(**user.data)
+    return BaseUser.model_construct(email=user.email)
 
 
 @router.get("/admin", include_in_schema=False)
@@ -48,13 +70,40 @@ async def test_admin_access_endpoint(
     return "ok"
 
 
+@router.post("/users/import", response_model=UserImportResult)
+async def import_users(
+    file: UploadFile,
+    _: JWTData = Depends(valid_admin_user),
+) -> UserImportResult:
+    return await service.imports.import_users(file.file, file.filename or "")
+
+
+@router.get("/users/export", response_class=StreamingResponse)
+async def export_users(
+    file_format: Literal["csv", "xlsx"] = Query("csv", alias="format"),
+    _: JWTData = Depends(valid_admin_user),
+) -> StreamingResponse:
+    if file_format == "xlsx":
+        content, media_type = (
+            service.exports.users_xlsx(),
+            service.exports.XLSX_MEDIA_TYPE,
+        )
+    else:
+        content, media_type = (
+            service.exports.users_csv(),
+            service.exports.CSV_MEDIA_TYPE,
+        )
+
+    filename = f"users-{date.today().isoformat()}.{file_format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    return StreamingResponse(content, media_type=media_type, headers=headers)
+
+
 @router.post("/signup", status_code=status.HTTP_201_CREATED, response_model=BaseUser)
-async def register_user(
-    auth_data: AuthUser = Depends(email_not_taken),
-) -> BaseUser | HTTPException:
+async def register_user(auth_data: AuthUser) -> BaseUser:
     user = await service.create_user_with_password(auth_data)
     if not user:
-        raise DetailedHTTPException
+        raise EmailTaken()
     return user
 
 
@@ -62,9 +111,9 @@ async def register_user(
 async def auth_user(
     response: Response, user: AuthUserModel = Depends(service.authenticate_user)
 ) -> AccessTokenResponse:
-    access_token_value = service.jwts.create_access_token(
-        user_id=user.id, is_admin=user.is_admin
-    )
+    access_token_value = await service.jwts.issue_user_access_token(user.id)
+    if not access_token_value:
+        raise InvalidCredentials()
     refresh_token_value = await service.create_refresh_token(user_id=user.id)
 
     response.set_cookie(
@@ -82,15 +131,13 @@ async def auth_user(
 
 @router.put("/token", response_model=AccessTokenResponse)
 async def refresh_token(
-    worker: BackgroundTasks,
     response: Response,
-    refresh_token: AuthRefreshTokenModel = Depends(valid_refresh_token),
-    user: AuthUserModel = Depends(valid_refresh_token_user),
+    rotated: tuple[AuthUserModel, str] = Depends(rotated_refresh_token),
 ) -> AccessTokenResponse:
-    access_token_value = service.jwts.create_access_token(
-        user_id=user.id, is_admin=user.is_admin
-    )
-    refresh_token_value = await service.create_refresh_token(user_id=user.id)
+    user, refresh_token_value = rotated
+    access_token_value = await service.jwts.issue_user_access_token(user.id)
+    if not access_token_value:
+        raise RefreshTokenNotValid()
 
     response.set_cookie(
         **service.token.get_refresh_token_settings(refresh_token_value).data
@@ -99,15 +146,13 @@ async def refresh_token(
         **service.token.get_access_token_settings(access_token_value).data
     )
 
-    worker.add_task(service.expire_refresh_token, refresh_token.uuid)
-
     return AccessTokenResponse(
         access_token=access_token_value,
         refresh_token=refresh_token_value,
     )
 
 
-@router.delete("/token")
+@router.delete("/token", dependencies=[Depends(database.request_unit_of_work)])
 async def logout_user(
     response: Response,
     refresh_token: AuthRefreshTokenModel = Depends(valid_refresh_token),
@@ -133,7 +178,7 @@ async def google_login() -> RedirectResponse:
         )
 
 
-@router.get("/google/callback")
+@router.get("/google/callback", dependencies=[Depends(database.request_unit_of_work)])
 async def google_callback(request: Request) -> RedirectResponse:
     """Process login response from Google and return user info"""
 
@@ -145,10 +190,15 @@ async def google_callback(request: Request) -> RedirectResponse:
 
     user_stored = await service.get_user_by_email(user.email)
     if not user_stored:
-        user_stored = await service.create_user_with_sso(user.email)
+        # A concurrent callback may have created the user meanwhile
+        user_stored = await service.create_user_with_sso(
+            user.email
+        ) or await service.get_user_by_email(user.email)
         assert user_stored is not None, "Empty user returned"
 
-    access_token_value = service.jwts.create_access_token(user=user_stored)
+    access_token_value = await service.jwts.issue_user_access_token(user_stored.id)
+    if not access_token_value:
+        raise BadRequest
     refresh_token_value = await service.create_refresh_token(user_id=user_stored.id)
 
     response = RedirectResponse(url="/", status_code=status.HTTP_302_FOUND)
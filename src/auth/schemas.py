@@ -2,7 +2,7 @@ import re
 import typing
 from datetime import datetime
 
-from pydantic import EmailStr, Field, field_validator
+from pydantic import EmailStr, Field, computed_field, field_validator
 from typing_extensions import Annotated
 
 from src.schema import CustomModel
@@ -34,6 +34,9 @@ class AuthUser(BaseUser):
 class JWTData(CustomModel):
     user_id: int = Field(alias="sub")
     is_admin: bool = False
+    email: EmailStr | None = None
+    role: int | None = None
+    version: int | None = Field(default=None, alias="ver")
 
 
 class AccessTokenResponse(CustomModel):
@@ -41,6 +44,19 @@ class AccessTokenResponse(CustomModel):
     refresh_token: str
 
 
+class UserImportResult(CustomModel):
+    rows: int
+    created: int
+    skipped: int  # email already registered
+    rejected: int  # invalid email, password or role
+    seconds: float
+
+    @computed_field  # type: ignore[misc]
+    @property
+    def users_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
 class CookieParameters(CustomModel):
     key: str
     value: str = ""
@@ -1,15 +1,119 @@
+import asyncio
+import hashlib
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Sequence, TypeVar
+
 import argon2
 
 from src.auth.config import auth_settings
+from src.auth.exceptions import PasswordHasherBusy
+
+T = TypeVar("T")
 
+HASHER_POOL: Executor | None = None
+HASHER_SLOTS: asyncio.Semaphore | None = None
 
-def hash_password(plain_password: str) -> str:
+
+def _hash_password(plain_password: str) -> str:
     return auth_settings.password_hasher.hash(plain_password)
 
 
-def verify_password(password_hash: str, plain_password: str) -> bool:
+def _hash_passwords(plain_passwords: Sequence[str]) -> list[str]:
+    return [_hash_password(plain_password) for plain_password in plain_passwords]
+
+
+def _verify_password(password_hash: str, plain_password: str) -> bool:
     try:
         auth_settings.password_hasher.verify(password_hash, plain_password)
-    except argon2.exceptions.InvalidHashError:
+    except (argon2.exceptions.VerificationError, argon2.exceptions.InvalidHashError):
         return False
     return True
+
+
+async def open_password_hasher() -> None:
+    """
+    Start the hashing pool of the current worker process.
+
+    Must be called after the (gunicorn) worker has been forked, so every worker
+    owns its own pool. With `PASSWORD_HASHER_WORKERS=0` hashing falls back to the
+    default thread pool of the event loop.
+    """
+    global HASHER_POOL, HASHER_SLOTS
+
+    workers = auth_settings.PASSWORD_HASHER_WORKERS
+    HASHER_SLOTS = asyncio.Semaphore(
+        max(workers, 1) + auth_settings.PASSWORD_HASHER_QUEUE_SIZE
+    )
+    if workers > 0:
+        HASHER_POOL = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("fork")
+        )
+        # Fork the hashing processes now, before any connection pools are opened.
+        await asyncio.get_running_loop().run_in_executor(HASHER_POOL, int)
+
+
+async def close_password_hasher() -> None:
+    global HASHER_POOL, HASHER_SLOTS
+
+    if HASHER_POOL is not None:
+        HASHER_POOL.shutdown(wait=False, cancel_futures=True)
+    HASHER_POOL = None
+    HASHER_SLOTS = None
+
+
+async def _run_in_hasher(func: Callable[..., T], *args: Any) -> T:
+    loop = asyncio.get_running_loop()
+    if HASHER_SLOTS is None:
+        return await loop.run_in_executor(HASHER_POOL, func, *args)
+
+    if HASHER_SLOTS.locked():
+        raise PasswordHasherBusy()
+
+    async with HASHER_SLOTS:
+        return await loop.run_in_executor(HASHER_POOL, func, *args)
+
+
+async def hash_password(plain_password: str) -> str:
+    return await _run_in_hasher(_hash_password, plain_password)
+
+
+async def hash_passwords(
+    plain_passwords: Sequence[str],
+    *,
+    executor: Executor | None = None,
+    concurrency: int | None = None,
+) -> list[str]:
+    """
+    Hash passwords in bulk, in chunks spread over the hashing pool.
+
+    Unlike `hash_password` it waits for the pool instead of failing fast, with
+    at most `concurrency` chunks queued so that signins are served in between.
+    """
+    loop = asyncio.get_running_loop()
+    pool = executor or HASHER_POOL
+    chunk_size = auth_settings.PASSWORD_HASHER_CHUNK_SIZE
+    slots = asyncio.Semaphore(
+        concurrency or max(auth_settings.PASSWORD_HASHER_WORKERS, 1)
+    )
+
+    async def _hash_chunk(chunk: Sequence[str]) -> list[str]:
+        async with slots:
+            return await loop.run_in_executor(pool, _hash_passwords, chunk)
+
+    chunks = await asyncio.gather(
+        *(
+            _hash_chunk(plain_passwords[i : i + chunk_size])
+            for i in range(0, len(plain_passwords), chunk_size)
+        )
+    )
+    return [password_hash for chunk in chunks for password_hash in chunk]
+
+
+async def verify_password(password_hash: str, plain_password: str) -> bool:
+    return await _run_in_hasher(_verify_password, password_hash, plain_password)
+
+
+def hash_refresh_token(refresh_token: str) -> bytes:
+    """Fixed-width lookup key of a refresh token, see `auth_refresh_token` index."""
+    return hashlib.sha256(refresh_token.encode()).digest()
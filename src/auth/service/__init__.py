@@ -1,3 +1,13 @@
 # ruff: noqa
-from src.auth.service import jwts, token
+from src.auth.service import (
+    domains,
+    exports,
+    imports,
+    jwts,
+    keys,
+    queries,
+    reaper,
+    token,
+    versions,
+)
 from src.auth.service.core import *
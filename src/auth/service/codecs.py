@@ -0,0 +1,206 @@
+import abc
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import time
+from typing import Any, Protocol
+
+import orjson
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives.asymmetric.ed25519 import (
+    Ed25519PrivateKey,
+    Ed25519PublicKey,
+)
+from cryptography.hazmat.primitives.serialization import (
+    Encoding,
+    PublicFormat,
+    load_pem_private_key,
+    load_pem_public_key,
+)
+from jose import JWTError, jwk, jwt
+
+from src.auth.exceptions import InvalidToken
+
+HMAC_ALGORITHMS = {
+    "HS256": hashlib.sha256,
+    "HS384": hashlib.sha384,
+    "HS512": hashlib.sha512,
+}
+
+
+class JWTCodec(Protocol):
+    """Signs and verifies the compact JWS form of the access token claims."""
+
+    # Encoded header segment, identifies the key a token was signed with
+    header: bytes
+
+    def encode(self, claims: dict[str, Any]) -> str: ...
+
+    def decode(self, token: str) -> dict[str, Any]: ...
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+def _header_segment(alg: str, typ: str = "JWT", **headers: Any) -> bytes:
+    # Same bytes as python-jose produces, so both codecs issue identical tokens
+    header = {"alg": alg, "typ": typ, **headers}
+    return _b64encode(
+        json.dumps(header, separators=(",", ":"), sort_keys=True).encode()
+    )
+
+
+class JoseCodec:
+    """Reference codec built on python-jose, also used for RSA and ECDSA keys."""
+
+    def __init__(self, key: str, algorithm: str, kid: str | None = None) -> None:
+        self.key = key
+        self.algorithm = algorithm
+        self.verify_key: Any = key
+        if algorithm not in HMAC_ALGORITHMS:
+            self.verify_key = jwk.construct(key, algorithm).public_key()
+        self.headers = {"kid": kid} if kid else None
+        self.header = _header_segment(algorithm, **(self.headers or {}))
+
+    def encode(self, claims: dict[str, Any]) -> str:
+        token: str = jwt.encode(
+            claims, self.key, algorithm=self.algorithm, headers=self.headers
+        )
+        return token
+
+    def decode(self, token: str) -> dict[str, Any]:
+        try:
+            claims: dict[str, Any] = jwt.decode(
+                token, self.verify_key, algorithms=[self.algorithm]
+            )
+        except JWTError:
+            raise InvalidToken()
+        return claims
+
+
+class _CompactCodec(abc.ABC):
+    """
+    Fast path codec: the header segment is encoded once, the claims are dumped
+    with a compact encoder and `exp`/`nbf` are compared as plain numbers.
+    """
+
+    algorithm: str
+
+    def __init__(self, algorithm: str, kid: str | None = None) -> None:
+        self.algorithm = algorithm
+        self.header_fields = {"alg": algorithm, "typ": "JWT"}
+        if kid:
+            self.header_fields["kid"] = kid
+        self.header = _header_segment(**self.header_fields)
+
+    @abc.abstractmethod
+    def _sign(self, signing_input: bytes) -> bytes: ...
+
+    @abc.abstractmethod
+    def _verify(self, signing_input: bytes, signature: bytes) -> bool: ...
+
+    def encode(self, claims: dict[str, Any]) -> str:
+        signing_input = self.header + b"." + _b64encode(orjson.dumps(claims))
+        return (signing_input + b"." + _b64encode(self._sign(signing_input))).decode()
+
+    def decode(self, token: str) -> dict[str, Any]:
+        try:
+            signing_input, _, signature = token.encode("ascii").rpartition(b".")
+            header, _, payload = signing_input.partition(b".")
+            if header != self.header and (
+                orjson.loads(_b64decode(header)) != self.header_fields
+            ):
+                raise InvalidToken()
+            if not payload or not self._verify(signing_input, _b64decode(signature)):
+                raise InvalidToken()
+            claims = orjson.loads(_b64decode(payload))
+        except (ValueError, binascii.Error):
+            raise InvalidToken()
+
+        if not isinstance(claims, dict):
+            raise InvalidToken()
+
+        now = time.time()
+        exp = claims.get("exp")
+        if exp is not None and (not isinstance(exp, int | float) or exp < now):
+            raise InvalidToken()
+        nbf = claims.get("nbf")
+        if nbf is not None and (not isinstance(nbf, int | float) or nbf > now):
+            raise InvalidToken()
+        return claims
+
+
+class HMACCodec(_CompactCodec):
+    """HS256/384/512 with the key pads hashed once at start-up."""
+
+    def __init__(self, key: str, algorithm: str, kid: str | None = None) -> None:
+        super().__init__(algorithm, kid)
+        self._mac = hmac.new(key.encode(), digestmod=HMAC_ALGORITHMS[algorithm])
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        mac = self._mac.copy()
+        mac.update(signing_input)
+        return mac.digest()
+
+    def _verify(self, signing_input: bytes, signature: bytes) -> bool:
+        return hmac.compare_digest(self._sign(signing_input), signature)
+
+
+class EdDSACodec(_CompactCodec):
+    """
+    Ed25519 signatures. A codec built from a public key only verifies tokens.
+    """
+
+    def __init__(self, key_pem: str, kid: str | None = None) -> None:
+        super().__init__("EdDSA", kid)
+        self._private_key: Ed25519PrivateKey | None = None
+        self.public_key: Ed25519PublicKey
+        if "PRIVATE KEY" in key_pem:
+            private_key = load_pem_private_key(key_pem.encode(), password=None)
+            if not isinstance(private_key, Ed25519PrivateKey):
+                raise ValueError("EdDSA tokens require an Ed25519 private key")
+            self._private_key = private_key
+            self.public_key = private_key.public_key()
+        else:
+            public_key = load_pem_public_key(key_pem.encode())
+            if not isinstance(public_key, Ed25519PublicKey):
+                raise ValueError("EdDSA tokens require an Ed25519 public key")
+            self.public_key = public_key
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        if self._private_key is None:
+            raise ValueError("The EdDSA codec was built from a public key")
+        signature: bytes = self._private_key.sign(signing_input)
+        return signature
+
+    def public_jwk(self) -> dict[str, str]:
+        raw = self.public_key.public_bytes(Encoding.Raw, PublicFormat.Raw)
+        return {"kty": "OKP", "crv": "Ed25519", "x": _b64encode(raw).decode()}
+
+    def _verify(self, signing_input: bytes, signature: bytes) -> bool:
+        try:
+            self.public_key.verify(signature, signing_input)
+        except InvalidSignature:
+            return False
+        return True
+
+
+def create_codec(
+    name: str, key: str, algorithm: str, kid: str | None = None
+) -> JWTCodec:
+    """
+    Build the codec for one key. The fast codec covers HMAC and EdDSA,
+    RSA and ECDSA keys are always handled by python-jose.
+    """
+    if name == "fast" and algorithm in HMAC_ALGORITHMS:
+        return HMACCodec(key, algorithm, kid)
+    if algorithm == "EdDSA":
+        return EdDSACodec(key, kid)
+    return JoseCodec(key, algorithm, kid)
@@ -1,76 +1,267 @@
+import json
+import logging
+import time
 import uuid
 from datetime import datetime, timedelta
 from typing import Any, Sequence
 
+import psycopg
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import UUID4
+from redis.exceptions import RedisError
 
-from src import utils
+from src import caching, database, loaders, utils
 from src.auth.config import auth_settings
 from src.auth.exceptions import InvalidCredentials
 from src.auth.models import (
     AuthRefreshTokenModel,
     AuthUserModel,
-    DomainInformationModel,
     UserRoles,
 )
 from src.auth.schemas import AuthUser, BaseUser, DomainNameValidator
-from src.auth.security import hash_password, verify_password
-from src.database import execute, fetch_one
+from src.auth.security import hash_password, hash_refresh_token, verify_password
+from src.auth.service import domains, queries, versions
+from src.config import settings
+from src.database import execute, fetch_all, fetch_one
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token", auto_error=False)
 
+USER_CACHE = "auth_user"
+user_cache: caching.LocalCache[AuthUserModel] = caching.LocalCache(
+    USER_CACHE,
+    maxsize=auth_settings.USER_CACHE_SIZE,
+    ttl=auth_settings.USER_CACHE_LOCAL_TTL,
+)
+
+# Held by the worker flushing the redis copies after a bulk change
+USER_CACHE_FLUSH_KEY = f"{USER_CACHE}_flush"
+USER_CACHE_FLUSH_GUARD_MS = 1000
+
+
+def _user_id_key(user_id: int) -> str:
+    return f"{USER_CACHE}:id:{user_id}"
+
+
+def _user_email_key(email: str) -> str:
+    return f"{USER_CACHE}:email:{email.lower()}"
+
+
+async def _get_cached_user(key: str) -> AuthUserModel | None:
+    user = user_cache.get(key)
+    if user is not None:
+        return user
+
+    attributes = {"cache": USER_CACHE, "tier": "redis"}
+    generation = user_cache.generation
+    try:
+        cached = await caching.get_by_key(key)
+    except RedisError as e:
+        logging.error(f"User cache is unavailable: {e}")
+        return None
+
+    if not cached:
+        caching.cache_misses_counter.add(1, attributes)
+        return None
 
-async def _insert_user(query: str, values: Sequence[Any]) -> BaseUser | None:
+    data = json.loads(cached)
+    caching.cache_hits_counter.add(1, attributes)
+    caching.cache_staleness.record(time.time() - data.pop("cached_at"), attributes)
+
+    user = _user_from_cache(data)
+    user_cache.set(key, user, generation=generation)
+    return user
+
+
+def _user_from_cache(data: dict[str, Any]) -> AuthUserModel:
+    # Cached users are JSON, they go through validation to get their types back
+    return AuthUserModel(**{**data, "password": None})
+
+
+user_row = database.trusted_row(AuthUserModel.from_row)
+refresh_token_row = database.trusted_row(AuthRefreshTokenModel.from_row)
+
+
+async def _cache_users(
+    rows: Sequence[dict[str, Any]], generation: int
+) -> list[AuthUserModel]:
+    """
+    Users of the rows, cached in both tiers unless `user_cache` was invalidated
+    since `generation`, taken before the rows were read: they may be stale.
+    """
+    if generation != user_cache.generation:
+        return [AuthUserModel.from_row(data) for data in rows]
+
+    users: list[AuthUserModel] = []
+    values: dict[str, str] = {}
+    cached_at = time.time()
+    for data in rows:
+        user = AuthUserModel.from_row(data)
+        value = json.dumps({**data, "cached_at": cached_at}, default=datetime.isoformat)
+        for key in (_user_id_key(user.id), _user_email_key(user.email)):
+            user_cache.set(key, user)
+            values[key] = value
+        users.append(user)
+
+    if values:
+        try:
+            await caching.redis_client.set_many(
+                values, ttl=auth_settings.USER_CACHE_TTL
+            )
+        except RedisError as e:
+            logging.error(f"User cache is unavailable: {e}")
+
+    return users
+
+
+async def _cache_user(data: dict[str, Any], generation: int) -> AuthUserModel:
+    (user,) = await _cache_users([data], generation)
+    return user
+
+
+async def _invalidate_user(user_id: int, email: str) -> None:
+    keys = _user_id_key(user_id), _user_email_key(email)
+    loaders.forget(USER_CACHE, keys)
+    await caching.invalidate(USER_CACHE, *keys)
+    if database.PG_REPLICA_POOL is not None:
+        caching.invalidate_later(settings.POSTGRES_REPLICA_MAX_LAG, USER_CACHE, *keys)
+
+
+@database.on_row_change(queries.USERS)
+async def _forget_changed_users(rows: database.RowChanges) -> None:
+    # Rows changed outside of this service too: other nodes, migrations, DBAs
+    if rows is None:
+        # Any copy may be stale. Every worker of every node gets the
+        # notification, the first one flushes redis, then the local tier of
+        # all the workers, which may have refilled from redis meanwhile.
+        user_cache.clear()
+        try:
+            if await caching.redis_client.set(
+                USER_CACHE_FLUSH_KEY, 1, nx=True, px=USER_CACHE_FLUSH_GUARD_MS
+            ):
+                await caching.delete_prefix(f"{USER_CACHE}:")
+                user_cache.clear()
+                await caching.invalidate(USER_CACHE)
+        except RedisError as e:
+            logging.error(f"Failed to invalidate {USER_CACHE} cache: {e}")
+        return
+
+    keys = [
+        key
+        for row in rows
+        for key in (_user_id_key(row["id"]), _user_email_key(row["email"]))
+    ]
+    user_cache.delete(*keys)
+    try:
+        await caching.redis_client.delete(*keys)
+    except RedisError as e:
+        logging.error(f"Failed to invalidate {USER_CACHE} cache: {e}")
+
+
+async def _insert_user(query: database.Query, values: Sequence[Any]) -> BaseUser | None:
     data = await fetch_one(query, values)
-    return BaseUser(**data) if data else None
+    if not data:
+        return None
+
+    await _invalidate_user(data["id"], data["email"])
+    return BaseUser.model_construct(email=data["email"])
 
 
 async def create_user_with_password(user: AuthUser) -> BaseUser | None:
-    query = f"""
-        INSERT INTO {AuthUserModel.table_name()} (email, password, created_at)
-        VALUES (%s, %s, %s) RETURNING *;
-    """
-    values = (user.email, hash_password(user.password), datetime.now())
-    return await _insert_user(query, values)
+    """Create the user in one statement, `None` when the email is taken."""
+    values = (user.email, await hash_password(user.password), datetime.now())
+    return await _insert_user(queries.INSERT_USER, values)
 
 
 async def create_user_with_password_and_role(
     user: AuthUser, role: UserRoles
 ) -> BaseUser | None:
-    query = f"""
-        INSERT INTO {AuthUserModel.table_name()} (email, password, created_at, role)
-        VALUES (%s, %s, %s, %s) RETURNING *;
-    """
-    values = (user.email, hash_password(user.password), datetime.now(), role.value)
-    return await _insert_user(query, values)
+    values = (
+        user.email,
+        await hash_password(user.password),
+        datetime.now(),
+        role.value,
+    )
+    return await _insert_user(queries.INSERT_USER_WITH_ROLE, values)
 
 
 async def create_user_with_sso(email: str) -> AuthUserModel | None:
-    query = f"""
-        INSERT INTO {AuthUserModel.table_name()} (email, password, created_at)
-        VALUES (%s, %s, %s) RETURNING *;
-    """
     values = (email, utils.generate_random_password(), datetime.now())
-    data = await fetch_one(query, values)
-    return AuthUserModel(**data) if data else None
+    data = await fetch_one(queries.INSERT_USER, values)
+    if not data:
+        return None
+
+    await _invalidate_user(data["id"], data["email"])
+    return AuthUserModel.from_row(data)
+
+
+async def _revoke_users(users: Sequence[dict[str, Any]]) -> None:
+    # Cached copies go first, claims read once the version moved are the new ones
+    for user in users:
+        await _invalidate_user(user["id"], user["email"])
+    if users:
+        await versions.bump_user_version(*(user["id"] for user in users))
 
 
 async def delete_user(user_email: str) -> None:
-    query = f"DELETE FROM {AuthUserModel.table_name()} WHERE email = %s;"
-    await execute(query, (user_email,))
+    await _revoke_users(await fetch_all(queries.DELETE_USER, (user_email,)))
+
+
+async def update_user_role(user_id: int, role: UserRoles) -> None:
+    values = (role.value, datetime.now(), user_id)
+    await _revoke_users(await fetch_all(queries.UPDATE_USER_ROLE, values))
+
+
+async def _load_users_by_id(user_ids: list[int]) -> dict[int, AuthUserModel]:
+    generation = user_cache.generation
+    rows = await fetch_all(queries.USERS_BY_IDS, (user_ids,))
+    return {user.id: user for user in await _cache_users(rows, generation)}
+
+
+user_loader = loaders.DataLoader(USER_CACHE, _load_users_by_id)
+
+
+async def _get_user_by_id(user_id: int) -> AuthUserModel | None:
+    if user := await _get_cached_user(_user_id_key(user_id)):
+        return user
+
+    if database.reads_from_primary():
+        # Batches are shared with other requests and read from the replica
+        return (await _load_users_by_id([user_id])).get(user_id)
+    return await user_loader.load(user_id)
 
 
 async def get_user_by_id(user_id: int) -> AuthUserModel | None:
-    query = f"SELECT * FROM {AuthUserModel.table_name()} WHERE id = %s;"
-    data = await fetch_one(query, (user_id,))
-    return AuthUserModel(**data) if data else None
+    return await loaders.identity_mapped(
+        USER_CACHE, _user_id_key(user_id), lambda: _get_user_by_id(user_id)
+    )
+
+
+async def _get_user_by_email(email: str) -> AuthUserModel | None:
+    if user := await _get_cached_user(_user_email_key(email)):
+        return user
+
+    generation = user_cache.generation
+    data = await fetch_one(queries.USER_BY_EMAIL, (email,))
+    return await _cache_user(data, generation) if data else None
 
 
 async def get_user_by_email(email: str) -> AuthUserModel | None:
-    query = f"SELECT * FROM {AuthUserModel.table_name()} WHERE email = %s;"
-    data = await fetch_one(query, (email,))
-    return AuthUserModel(**data) if data else None
+    user = await loaders.identity_mapped(
+        USER_CACHE, _user_email_key(email), lambda: _get_user_by_email(email)
+    )
+    if user:
+        loaders.remember(USER_CACHE, _user_id_key(user.id), user)
+    return user
+
+
+async def get_user_claims(user_id: int) -> AuthUserModel | None:
+    """
+    User to sign into an access token. It is read on the primary, the cached
+    copies of other workers are only dropped once the invalidation reaches them.
+    """
+    return await fetch_one(  # type: ignore[no-any-return]
+        queries.USER_CLAIMS_BY_ID, (user_id,), row_factory=user_row
+    )
 
 
 async def create_refresh_token(user_id: int, refresh_token: str | None = None) -> str:
@@ -80,44 +271,73 @@ async def create_refresh_token(user_id: int, refresh_token: str | None = None) -
     data = (
         uuid.uuid4(),
         refresh_token,
+        hash_refresh_token(refresh_token),
         datetime.now() + timedelta(seconds=auth_settings.REFRESH_TOKEN_EXP),
         user_id,
     )
-
-    query = f"""
-        INSERT INTO {AuthRefreshTokenModel.table_name()}
-            (uuid, refresh_token, expires_at, user_id)
-        VALUES (%s, %s, %s, %s);
-    """
-    await execute(query, data)
+    await execute(queries.INSERT_REFRESH_TOKEN, data)
     return refresh_token
 
 
+async def _get_refresh_token(digest: bytes) -> AuthRefreshTokenModel | None:
+    return await fetch_one(  # type: ignore[no-any-return]
+        queries.REFRESH_TOKEN_BY_DIGEST, (digest,), row_factory=refresh_token_row
+    )
+
+
 async def get_refresh_token(refresh_token: str) -> AuthRefreshTokenModel | None:
-    query = f"""
-        SELECT * FROM {AuthRefreshTokenModel.table_name()} WHERE refresh_token = %s;
-    """
-    data = await fetch_one(query, (refresh_token,))
-    return AuthRefreshTokenModel(**data) if data else None
+    digest = hash_refresh_token(refresh_token)
+    return await loaders.identity_mapped(
+        AuthRefreshTokenModel.table_name(), digest, lambda: _get_refresh_token(digest)
+    )
 
 
 async def expire_refresh_token(refresh_token_uuid: UUID4) -> None:
-    query = f"""
-        UPDATE {AuthRefreshTokenModel.table_name()} SET expires_at = %s WHERE uuid = %s;
+    values = (datetime.now() - timedelta(days=1), refresh_token_uuid)
+    await execute(queries.EXPIRE_REFRESH_TOKEN, values)
+    loaders.forget(AuthRefreshTokenModel.table_name())
+
+
+async def rotate_refresh_token(
+    refresh_token: str,
+) -> tuple[AuthUserModel, str] | None:
     """
-    await execute(query, (datetime.now() - timedelta(days=1), refresh_token_uuid))
+    Swap a valid refresh token for a new one in a single statement.
+
+    The old token is expired, the new one is inserted and the owner is returned
+    atomically, so concurrent rotations of the same token can't both succeed.
+    """
+    new_refresh_token = utils.generate_random_alphanum(64)
+    now = datetime.now()
+    values = (
+        now - timedelta(days=1),
+        hash_refresh_token(refresh_token),
+        now,
+        uuid.uuid4(),
+        new_refresh_token,
+        hash_refresh_token(new_refresh_token),
+        now + timedelta(seconds=auth_settings.REFRESH_TOKEN_EXP),
+    )
+    loaders.forget(queries.TOKENS, [hash_refresh_token(refresh_token)])
+    try:
+        user = await fetch_one(
+            queries.ROTATE_REFRESH_TOKEN, values, row_factory=user_row
+        )
+    except psycopg.errors.SerializationFailure:
+        # Concurrent rotation moved the token to another partition
+        return None
+    return (user, new_refresh_token) if user else None
 
 
 async def authenticate_user(auth_data: AuthUser) -> AuthUserModel:
-    user: AuthUserModel | None = await get_user_by_email(auth_data.email)
-    if not user or not verify_password(user.password, auth_data.password):
+    # Password hashes are never cached, the credentials are read on every signin
+    data = await fetch_one(queries.USER_CREDENTIALS_BY_EMAIL, (auth_data.email,))
+    if not data or not data["password"]:
         raise InvalidCredentials()
-    return user
+    if not await verify_password(data["password"], auth_data.password):
+        raise InvalidCredentials()
+    return AuthUserModel.from_row({**data, "password": None})
 
 
 async def check_domain_is_registered(domain_name: DomainNameValidator) -> bool:
-    query = f"""
-        SELECT id FROM {DomainInformationModel.table_name()} WHERE domain_name = %s
-    """
-    result = await fetch_one(query, (domain_name.domain,))
-    return True if result else False
+    return await domains.is_registered(domain_name.domain)
@@ -0,0 +1,238 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Iterable
+
+from opentelemetry import metrics
+
+from src import caching, database
+from src.auth.config import auth_settings
+from src.auth.models import DomainInformationModel
+from src.auth.service import queries
+from src.config import settings
+from src.database import fetch_all, fetch_one
+from src.snapshots import SharedStringSet
+
+DOMAIN_CACHE = "domain_registry"
+
+meter = metrics.get_meter(__name__)
+
+fallback_queries_counter = meter.create_counter(
+    "auth.domain_registry.fallback_queries",
+    unit="{query}",
+    description="Domain lookups answered by the database",
+)
+
+unknown_domains: caching.LocalCache[bool] = caching.LocalCache(
+    "domain_negative",
+    maxsize=auth_settings.DOMAIN_NEGATIVE_CACHE_SIZE,
+    ttl=auth_settings.DOMAIN_NEGATIVE_CACHE_TTL,
+)
+
+
+class DomainRegistry:
+    """
+    In-memory copy of the registered domain names.
+
+    Rows created or updated since the last refresh are fetched incrementally.
+    The table row count comes with every refresh, a mismatch (deleted rows)
+    triggers a full reload, as does `DOMAIN_REGISTRY_RELOAD_INTERVAL`.
+
+    With a `shared` snapshot only the worker publishing it loads the names,
+    the others look them up in the snapshot. They keep the names found by
+    fallback queries until their next refresh, and take over the publication
+    when its worker is gone.
+    """
+
+    def __init__(self, shared: SharedStringSet | None = None) -> None:
+        self.shared = shared
+        self.names: dict[int, str] = {}
+        self.domains: set[str] = set()
+        self.changed_after: datetime | None = None
+        self.refreshed_at = 0.0  # monotonic
+        self.reloaded_at = 0.0  # monotonic
+
+    @property
+    def follows(self) -> bool:
+        """Whether the names are read from a snapshot published by another worker."""
+        return self.shared is not None and not self.shared.is_publisher
+
+    @property
+    def is_fresh(self) -> bool:
+        """Whether a lookup miss can be trusted without asking the database."""
+        max_age = 3 * auth_settings.DOMAIN_REGISTRY_REFRESH_INTERVAL
+        if self.shared is not None and self.follows:
+            published_at = self.shared.published_at
+            return published_at is not None and time.time() - published_at < max_age
+        return (
+            self.changed_after is not None
+            and time.monotonic() - self.refreshed_at < max_age
+        )
+
+    def __contains__(self, domain: str) -> bool:
+        if domain in self.domains:
+            return True
+        return self.shared is not None and self.follows and domain in self.shared
+
+    def __len__(self) -> int:
+        if self.shared is not None and self.follows:
+            return len(self.shared)
+        return len(self.domains)
+
+    def add(self, domain_id: int, domain: str) -> None:
+        previous = self.names.get(domain_id)
+        if previous is not None and previous != domain:
+            self.domains.discard(previous)
+        self.names[domain_id] = domain
+        self.domains.add(domain)
+
+    def _follow(self) -> bool:
+        """Publish the snapshot if no other worker does, otherwise follow it."""
+        if self.shared is None or self.shared.try_publish():
+            return False
+
+        self.names.clear()
+        self.domains.clear()
+        return True
+
+    async def _publish(self, changed: bool) -> None:
+        if self.shared is None:
+            return
+        if changed:
+            await asyncio.to_thread(self.shared.publish, list(self.domains))
+        else:
+            self.shared.touch()
+
+    async def reload(self) -> None:
+        if self._follow():
+            unknown_domains.clear()
+            return
+
+        table = DomainInformationModel.table_name()
+        rows = await fetch_all(
+            f"""
+            SELECT id, domain_name, greatest(created_at, updated_at) AS changed_at
+            FROM {table};
+            """
+        )
+        self.names = {row["id"]: row["domain_name"] for row in rows}
+        self.domains = set(self.names.values())
+        self.changed_after = max(
+            (row["changed_at"] for row in rows), default=datetime.min
+        )
+        self.refreshed_at = self.reloaded_at = time.monotonic()
+        unknown_domains.clear()
+        await self._publish(changed=True)
+
+    async def refresh(self) -> None:
+        if self._follow():
+            return
+
+        reload_interval = auth_settings.DOMAIN_REGISTRY_RELOAD_INTERVAL
+        if (
+            self.changed_after is None
+            or time.monotonic() - self.reloaded_at > reload_interval
+        ):
+            return await self.reload()
+
+        table = DomainInformationModel.table_name()
+        rows = await fetch_all(
+            f"""
+            SELECT
+                id,
+                domain_name,
+                greatest(created_at, updated_at) AS changed_at,
+                NULL AS total
+            FROM {table}
+            WHERE created_at >= %(after)s OR updated_at >= %(after)s
+            UNION ALL
+            SELECT NULL, NULL, NULL, count(*) FROM {table};
+            """,
+            {"after": self.changed_after},
+        )
+        total, changed = 0, False
+        for row in rows:
+            if row["id"] is None:
+                total = row["total"]
+                continue
+            # Rows changed at `changed_after` itself are fetched again
+            changed = changed or self.names.get(row["id"]) != row["domain_name"]
+            self.add(row["id"], row["domain_name"])
+            self.changed_after = max(self.changed_after, row["changed_at"])
+            unknown_domains.delete(row["domain_name"])
+
+        if total != len(self.names):
+            return await self.reload()
+        self.refreshed_at = time.monotonic()
+        await self._publish(changed)
+
+
+registry = DomainRegistry(
+    SharedStringSet(
+        settings.SNAPSHOT_DIR, f"{DOMAIN_CACHE}-{settings.database.db_name}"
+    )
+    if settings.SNAPSHOT_DIR
+    else None
+)
+
+
+@database.on_row_change(DomainInformationModel.table_name())
+async def _refresh_changed_domains(rows: database.RowChanges) -> None:
+    if rows is None:
+        return await registry.reload()
+
+    unknown_domains.delete(*(row["domain_name"] for row in rows))
+    await registry.refresh()
+
+
+def _observe_registry_size(
+    _: metrics.CallbackOptions,
+) -> Iterable[metrics.Observation]:
+    yield metrics.Observation(len(registry))
+
+
+meter.create_observable_gauge(
+    "auth.domain_registry.size",
+    callbacks=[_observe_registry_size],
+    unit="{domain}",
+    description="Registered domains held in worker memory",
+)
+
+
+async def is_registered(domain: str) -> bool:
+    """
+    Answer from memory when possible. Unknown domains are negative cached,
+    so hosts probed by scanners reach the database once per TTL at most.
+    """
+    attributes = {"cache": DOMAIN_CACHE, "tier": "local"}
+    if domain in registry:
+        caching.cache_hits_counter.add(1, attributes)
+        return True
+    caching.cache_misses_counter.add(1, attributes)
+
+    if registry.is_fresh or unknown_domains.get(domain):
+        return False
+
+    fallback_queries_counter.add(1)
+    result = await fetch_one(queries.DOMAIN_BY_NAME, (domain,))
+    if not result:
+        unknown_domains.set(domain, True)
+        return False
+
+    registry.add(result["id"], domain)
+    return True
+
+
+async def domain_registry_task() -> None:
+    logging.info("Domain registry refresh started.")
+
+    while True:
+        try:
+            await registry.refresh()
+        except asyncio.CancelledError:
+            logging.info("Domain registry refresh was cancelled.")
+            raise
+        except Exception as e:
+            logging.error(f"Domain registry refresh failed: {e}")
+        await asyncio.sleep(auth_settings.DOMAIN_REGISTRY_REFRESH_INTERVAL)
@@ -0,0 +1,192 @@
+"""
+Bulk user onboarding from CSV or XLSX files.
+
+The file is read lazily in batches, passwords are hashed across the hashing
+pool, every batch is copied into a staging table and merged into `auth_user`.
+Emails already registered, in any case, are skipped.
+
+    python -m src.auth.cli import-users users.xlsx --workers 8
+"""
+
+import asyncio
+import csv
+import io
+import logging
+import time
+import zipfile
+from concurrent.futures import Executor
+from typing import IO, Any, Iterator
+
+import openpyxl
+from openpyxl.utils.exceptions import InvalidFileException
+from opentelemetry import metrics
+from pydantic import ValidationError
+
+from src import database
+from src.auth.config import auth_settings
+from src.auth.exceptions import ImportFileNotValid
+from src.auth.models import AuthUserModel, UserRoles
+from src.auth.schemas import AuthUser, BaseUser, UserImportResult
+from src.auth.security import hash_passwords
+
+USERS = AuthUserModel.table_name()
+STAGING = f"{USERS}_import"
+
+MERGE_USERS = f"""
+    INSERT INTO {USERS} (email, password, role, created_at)
+    SELECT email, password, role, now() FROM {STAGING}
+    ON CONFLICT (lower(email)) DO NOTHING;
+"""
+
+meter = metrics.get_meter(__name__)
+
+imported_users_counter = meter.create_counter(
+    "auth.user_import.rows",
+    unit="{user}",
+    description="Rows of imported files, by outcome",
+)
+
+# (email, plain password or None, role)
+ImportedUser = tuple[str, str | None, int]
+
+
+def _csv_rows(file: IO[bytes]) -> Iterator[tuple[Any, ...]]:
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        for row in csv.reader(text):
+            yield tuple(row)
+    except (UnicodeDecodeError, csv.Error):
+        raise ImportFileNotValid()
+    finally:
+        # The upload is closed by its owner
+        text.detach()
+
+
+def _xlsx_rows(file: IO[bytes]) -> Iterator[tuple[Any, ...]]:
+    try:
+        workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    except (InvalidFileException, zipfile.BadZipFile, KeyError):
+        raise ImportFileNotValid()
+
+    try:
+        sheet = workbook.active
+        yield from sheet.iter_rows(values_only=True)  # type: ignore[union-attr]
+    finally:
+        workbook.close()
+
+
+def read_rows(file: IO[bytes], filename: str) -> Iterator[dict[str, Any]]:
+    """Rows of the first sheet keyed by their lower-cased header, read lazily."""
+    if filename.lower().endswith(".csv"):
+        rows = _csv_rows(file)
+    elif filename.lower().endswith(".xlsx"):
+        rows = _xlsx_rows(file)
+    else:
+        raise ImportFileNotValid()
+
+    names = [str(name or "").strip().lower() for name in next(rows, ())]
+    if "email" not in names:
+        raise ImportFileNotValid()
+
+    for row in rows:
+        yield dict(zip(names, row))
+
+
+def _parse_row(row: dict[str, Any]) -> ImportedUser | None:
+    email = str(row.get("email") or "").strip()
+    password = row.get("password")
+    password = str(password) if password not in (None, "") else None
+    role_name = str(row.get("role") or "USER").strip().upper()
+    if role_name not in UserRoles.__members__:
+        return None
+
+    try:
+        if password:
+            user: BaseUser = AuthUser(email=email, password=password)
+        else:
+            user = BaseUser(email=email)
+    except ValidationError:
+        return None
+    return user.email, password, UserRoles[role_name].value
+
+
+def _read_batch(
+    rows: Iterator[dict[str, Any]], batch_size: int
+) -> tuple[int, list[ImportedUser]]:
+    # Reading and validating is CPU bound, it runs in a thread
+    count, users = 0, []
+    for row in rows:
+        count += 1
+        if user := _parse_row(row):
+            users.append(user)
+        if count == batch_size:
+            break
+    return count, users
+
+
+async def _merge_batch(
+    users: list[ImportedUser], executor: Executor | None, concurrency: int | None
+) -> int:
+    passwords = [password for _, password, _ in users if password]
+    hashes = iter(
+        await hash_passwords(passwords, executor=executor, concurrency=concurrency)
+    )
+
+    async with database.db_cursor() as cur:
+        await cur.execute(
+            f"""
+            CREATE TEMP TABLE {STAGING} (email text, password text, role int)
+            ON COMMIT DROP;
+            """
+        )
+        async with cur.copy(
+            f"COPY {STAGING} (email, password, role) FROM STDIN"
+        ) as copy:
+            for email, password, role in users:
+                password_hash = next(hashes) if password else None
+                await copy.write_row((email, password_hash, role))
+        await cur.execute(MERGE_USERS)
+        return cur.rowcount
+
+
+async def import_users(
+    file: IO[bytes],
+    filename: str,
+    *,
+    executor: Executor | None = None,
+    concurrency: int | None = None,
+    batch_size: int | None = None,
+) -> UserImportResult:
+    """
+    Create the users of a file, the hashing pool of the worker is used unless
+    an `executor` running `concurrency` processes is given.
+    """
+    started = time.perf_counter()
+    batch_size = batch_size or auth_settings.USER_IMPORT_BATCH_SIZE
+    rows = read_rows(file, filename)
+    total = valid = created = 0
+
+    while True:
+        count, users = await asyncio.to_thread(_read_batch, rows, batch_size)
+        if not count:
+            break
+
+        total += count
+        valid += len(users)
+        if users:
+            created += await _merge_batch(users, executor, concurrency)
+
+    result = UserImportResult(
+        rows=total,
+        created=created,
+        skipped=valid - created,
+        rejected=total - valid,
+        seconds=time.perf_counter() - started,
+    )
+    for outcome in ("created", "skipped", "rejected"):
+        imported_users_counter.add(getattr(result, outcome), {"outcome": outcome})
+    logging.info(
+        f"Imported {filename}: {result.created} created, {result.skipped} skipped, "
+        f"{result.rejected} rejected, {result.users_per_second:.0f} users/s"
+    )
+    return result
@@ -1,19 +1,27 @@
-from datetime import datetime, timedelta
+import time
+from datetime import timedelta
 from typing import Any, Optional
 
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt
 
 from src.auth.config import auth_settings
+from src.auth.models import AuthUserModel
+from src.auth.service import core, versions
+from src.auth.service.keys import KeyRing, load_key_ring
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token", auto_error=False)
 
+key_ring: KeyRing = load_key_ring()
+
 
 def create_access_token(
     *,
     user_id: Optional[str] = None,
     is_admin: bool = False,
     is_registered: bool = False,
+    email: Optional[str] = None,
+    role: Optional[int] = None,
+    version: Optional[int] = None,
     expires_delta: timedelta = timedelta(seconds=auth_settings.JWT_EXP),
 ) -> Any:
     """
@@ -22,15 +30,53 @@ def create_access_token(
     :param user_id: ID of the user (None for non-registered users)
     :param is_admin: Boolean flag for admin status
     :param is_registered: Boolean flag indicating if the user is registered
+    :param email: Email of the user, served by /auth/me
+    :param role: Role of the user
+    :param version: Version of the user claims, see `versions`
     :param expires_delta: Expiration time for the token
     :return: Encoded JWT token
     """
-    jwt_data = {
+    jwt_data: dict[str, Any] = {
         "sub": str(user_id) if user_id else "non_registered_user",
-        "exp": datetime.now() + expires_delta,
+        "exp": int(time.time() + expires_delta.total_seconds()),
         "is_admin": is_admin,
         "is_registered": is_registered,
     }
-    return jwt.encode(
-        jwt_data, auth_settings.JWT_SECRET, algorithm=auth_settings.JWT_ALG
+    if email is not None:
+        jwt_data["email"] = email
+    if role is not None:
+        jwt_data["role"] = role
+    if version is not None:
+        jwt_data["ver"] = version
+    return key_ring.encode(jwt_data)
+
+
+def create_user_access_token(user: AuthUserModel, version: int) -> Any:
+    """Access token carrying the claims of a registered user."""
+    return create_access_token(
+        user_id=str(user.id),
+        is_admin=user.is_admin,
+        is_registered=True,
+        email=user.email,
+        role=user.role,
+        version=version,
     )
+
+
+async def issue_user_access_token(user_id: int) -> Any | None:
+    """
+    Access token of a user with current claims, None once the user is deleted.
+
+    The version is read before the claims: a token signed with a version bumped
+    by a role change or a delete carries the claims written before the bump.
+    """
+    version = await versions.issue_user_version(user_id)
+    user = await core.get_user_claims(user_id)
+    if user is None:
+        return None
+    return create_user_access_token(user, version)
+
+
+def decode_access_token(token: str) -> dict[str, Any]:
+    """Verify the signature and expiry of a token, raise `InvalidToken` otherwise."""
+    return key_ring.decode(token)
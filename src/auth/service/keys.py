@@ -0,0 +1,88 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Any
+
+from jose import jwk
+
+from src.auth.config import auth_settings
+from src.auth.exceptions import InvalidToken
+from src.auth.service.codecs import EdDSACodec, JWTCodec, create_codec
+
+
+class KeyRing:
+    """
+    All keys the tokens may be signed with, indexed by their encoded header.
+
+    The header segment of our tokens is deterministic and carries the `kid`,
+    so the verifying key is found by a dict lookup without parsing JSON.
+    Only the signing key issues tokens; retired keys keep verifying the
+    tokens issued before a rotation until they expire.
+    """
+
+    def __init__(
+        self,
+        signing: JWTCodec,
+        verifying: list[JWTCodec],
+        jwks: list[dict[str, Any]],
+    ) -> None:
+        self.signing = signing
+        self._codecs = {codec.header.decode(): codec for codec in verifying}
+        self.jwks = json.dumps({"keys": jwks}, separators=(",", ":")).encode()
+        self.jwks_etag = f'"{hashlib.sha256(self.jwks).hexdigest()[:32]}"'
+
+    def encode(self, claims: dict[str, Any]) -> str:
+        return self.signing.encode(claims)
+
+    def decode(self, token: str) -> dict[str, Any]:
+        codec = self._codecs.get(token.partition(".")[0])
+        if codec is None:
+            raise InvalidToken()
+        return codec.decode(token)
+
+
+def _public_jwk(codec: JWTCodec, key_pem: str, algorithm: str, kid: str) -> Any:
+    if isinstance(codec, EdDSACodec):
+        public = codec.public_jwk()
+    else:
+        public = jwk.construct(key_pem, algorithm).public_key().to_dict()
+
+    return {**public, "alg": algorithm, "kid": kid, "use": "sig"}
+
+
+def load_key_ring(
+    keys_dir: str | None = auth_settings.JWT_KEYS_DIR,
+    signing_kid: str | None = auth_settings.JWT_KEY_ID,
+    algorithm: str = auth_settings.JWT_ALG,
+) -> KeyRing:
+    """
+    Without a keys directory tokens are signed with the shared `JWT_SECRET`
+    and no key is published. Otherwise every `<kid>.pem` file of the directory
+    is loaded: private keys can sign, public ones only verify.
+    """
+    if not keys_dir:
+        codec = create_codec(
+            auth_settings.JWT_CODEC, auth_settings.JWT_SECRET, algorithm
+        )
+        return KeyRing(codec, [codec], [])
+
+    codecs: dict[str, JWTCodec] = {}
+    private_kids: list[str] = []
+    jwks = []
+    for path in sorted(Path(keys_dir).glob("*.pem")):
+        kid, key_pem = path.stem, path.read_text()
+        codec = create_codec(auth_settings.JWT_CODEC, key_pem, algorithm, kid)
+        codecs[kid] = codec
+        jwks.append(_public_jwk(codec, key_pem, algorithm, kid))
+        if "PRIVATE KEY" in key_pem:
+            private_kids.append(kid)
+
+    if signing_kid is None and len(private_kids) == 1:
+        signing_kid = private_kids[0]
+    if signing_kid not in private_kids:
+        raise ValueError(
+            f"JWT_KEY_ID must name one of the private keys in {keys_dir}: "
+            f"{', '.join(private_kids) or 'none found'}"
+        )
+
+    return KeyRing(codecs[signing_kid], list(codecs.values()), jwks)
@@ -0,0 +1,125 @@
+"""
+Statements of the auth service, prepared on every pooled connection.
+
+Users are selected without their password hash, which only
+`USER_CREDENTIALS_BY_EMAIL` returns for the signin check. Read-only lookups
+are served by the replica when one is configured, the signin check stays on
+the primary so a user can sign in right after signing up.
+
+Emails are matched case-insensitively through the unique `lower(email)` index,
+inserting a taken email returns no row.
+"""
+
+from src.auth.models import AuthRefreshTokenModel, AuthUserModel, DomainInformationModel
+from src.database import register_query
+
+USERS = AuthUserModel.table_name()
+TOKENS = AuthRefreshTokenModel.table_name()
+DOMAINS = DomainInformationModel.table_name()
+
+USER_COLUMNS = AuthUserModel.columns(exclude=("password",))
+REFRESH_TOKEN_COLUMNS = AuthRefreshTokenModel.columns(exclude=("refresh_token_digest",))
+
+USER_BY_ID = register_query(
+    "auth_user_by_id",
+    f"SELECT {USER_COLUMNS} FROM {USERS} WHERE id = %s;",
+    warmup=(0,),
+    readonly=True,
+)
+USERS_BY_IDS = register_query(
+    "auth_users_by_ids",
+    f"SELECT {USER_COLUMNS} FROM {USERS} WHERE id = ANY(%s);",
+    warmup=([0],),
+    readonly=True,
+)
+# Claims signed into access tokens, read on the primary past the caches
+USER_CLAIMS_BY_ID = register_query(
+    "auth_user_claims_by_id",
+    f"SELECT {USER_COLUMNS} FROM {USERS} WHERE id = %s;",
+    warmup=(0,),
+)
+USER_BY_EMAIL = register_query(
+    "auth_user_by_email",
+    f"SELECT {USER_COLUMNS} FROM {USERS} WHERE lower(email) = lower(%s);",
+    warmup=("",),
+    readonly=True,
+)
+USER_CREDENTIALS_BY_EMAIL = register_query(
+    "auth_user_credentials_by_email",
+    f"SELECT {AuthUserModel.columns()} FROM {USERS} WHERE lower(email) = lower(%s);",
+    warmup=("",),
+)
+INSERT_USER = register_query(
+    "auth_user_insert",
+    f"""
+    INSERT INTO {USERS} (email, password, created_at)
+    VALUES (%s, %s, %s)
+    ON CONFLICT (lower(email)) DO NOTHING RETURNING {USER_COLUMNS};
+    """,
+)
+INSERT_USER_WITH_ROLE = register_query(
+    "auth_user_insert_with_role",
+    f"""
+    INSERT INTO {USERS} (email, password, created_at, role)
+    VALUES (%s, %s, %s, %s)
+    ON CONFLICT (lower(email)) DO NOTHING RETURNING {USER_COLUMNS};
+    """,
+)
+DELETE_USER = register_query(
+    "auth_user_delete",
+    f"DELETE FROM {USERS} WHERE lower(email) = lower(%s) RETURNING id, email;",
+)
+UPDATE_USER_ROLE = register_query(
+    "auth_user_update_role",
+    f"""
+    UPDATE {USERS} SET role = %s, updated_at = %s
+    WHERE id = %s RETURNING id, email;
+    """,
+)
+
+REFRESH_TOKEN_BY_DIGEST = register_query(
+    "auth_refresh_token_by_digest",
+    # Digests are only unique per partition once the table is partitioned
+    f"""
+    SELECT {REFRESH_TOKEN_COLUMNS} FROM {TOKENS} WHERE refresh_token_digest = %s
+    ORDER BY expires_at DESC LIMIT 1;
+    """,
+    warmup=(b"",),
+    readonly=True,
+)
+INSERT_REFRESH_TOKEN = register_query(
+    "auth_refresh_token_insert",
+    f"""
+    INSERT INTO {TOKENS}
+        (uuid, refresh_token, refresh_token_digest, expires_at, user_id)
+    VALUES (%s, %s, %s, %s, %s);
+    """,
+)
+EXPIRE_REFRESH_TOKEN = register_query(
+    "auth_refresh_token_expire",
+    f"UPDATE {TOKENS} SET expires_at = %s WHERE uuid = %s;",
+)
+ROTATE_REFRESH_TOKEN = register_query(
+    "auth_refresh_token_rotate",
+    f"""
+    WITH expired AS (
+        UPDATE {TOKENS} SET expires_at = %s
+        WHERE refresh_token_digest = %s AND expires_at >= %s
+        RETURNING user_id
+    ), created AS (
+        INSERT INTO {TOKENS}
+            (uuid, refresh_token, refresh_token_digest, expires_at, user_id)
+        SELECT %s, %s, %s, %s, user_id FROM expired
+        RETURNING user_id
+    )
+    SELECT {AuthUserModel.columns(exclude=("password",), qualified=True)}
+    FROM {USERS} JOIN created ON {USERS}.id = created.user_id;
+    """,
+)
+
+DOMAIN_BY_NAME = register_query(
+    "domain_information_by_name",
+    f"SELECT id FROM {DOMAINS} WHERE domain_name = %s;",
+    warmup=("",),
+    readonly=True,
+)
@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import Iterable
+
+import psycopg
+from opentelemetry import metrics
+
+from src.auth.config import auth_settings
+from src.auth.models import AuthRefreshTokenModel
+from src.database import db_cursor, execute, fetch_all, fetch_one, unit_of_work
+
+PARTITION_PREFIX = f"{AuthRefreshTokenModel.table_name()}_p"
+PARTITION_LOCK_ID = 7_201_003  # pg advisory lock shared by all workers
+REAPER_LOCK_ID = 7_201_004  # pg advisory lock of the worker running the reaper
+PARTITION_LOCK_TIMEOUT_MS = 2000  # wait for the table lock of the DDL
+
+meter = metrics.get_meter(__name__)
+
+deleted_tokens_counter = meter.create_counter(
+    "auth.refresh_token_reaper.deleted",
+    unit="{token}",
+    description="Expired refresh tokens deleted row by row",
+)
+dropped_partitions_counter = meter.create_counter(
+    "auth.refresh_token_reaper.dropped_partitions",
+    unit="{partition}",
+    description="Expired refresh token partitions dropped",
+)
+reaper_run_duration = meter.create_histogram(
+    "auth.refresh_token_reaper.duration",
+    unit="s",
+    description="Duration of a single reaper run",
+)
+
+_table_stats: dict[str, int] = {"bytes": 0, "rows": 0}
+
+
+def _observe_table_bytes(
+    _: metrics.CallbackOptions,
+) -> Iterable[metrics.Observation]:
+    yield metrics.Observation(_table_stats["bytes"])
+
+
+def _observe_table_rows(
+    _: metrics.CallbackOptions,
+) -> Iterable[metrics.Observation]:
+    yield metrics.Observation(_table_stats["rows"])
+
+
+meter.create_observable_gauge(
+    "auth.refresh_tokens.table_size",
+    callbacks=[_observe_table_bytes],
+    unit="By",
+    description="Size of auth_refresh_token including indexes and partitions",
+)
+meter.create_observable_gauge(
+    "auth.refresh_tokens.rows",
+    callbacks=[_observe_table_rows],
+    unit="{token}",
+    description="Estimated number of stored refresh tokens",
+)
+
+
+def _partition_name(day: date) -> str:
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+
+async def delete_expired_refresh_tokens(expired_before: datetime, limit: int) -> int:
+    """Delete one batch of expired tokens, skipping rows locked by auth requests."""
+    table = AuthRefreshTokenModel.table_name()
+    query = f"""
+        WITH expired AS (
+            SELECT uuid FROM {table}
+            WHERE expires_at < %s
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        DELETE FROM {table} USING expired WHERE {table}.uuid = expired.uuid;
+    """
+    return await execute(query, (expired_before, limit))
+
+
+async def refresh_token_partitions() -> dict[date, str]:
+    query = """
+        SELECT child.relname AS name
+        FROM pg_inherits
+        JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+        JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+        WHERE parent.relname = %s AND child.relname LIKE %s;
+    """
+    rows = await fetch_all(
+        query, (AuthRefreshTokenModel.table_name(), f"{PARTITION_PREFIX}%")
+    )
+    partitions: dict[date, str] = {}
+    for row in rows:
+        day = datetime.strptime(row["name"].removeprefix(PARTITION_PREFIX), "%Y%m%d")
+        partitions[day.date()] = row["name"]
+    return partitions
+
+
+async def maintain_refresh_token_partitions(expired_before: datetime) -> int:
+    """
+    Create daily partitions for upcoming tokens and drop the fully expired ones.
+
+    Only one worker does the DDL at a time, the others skip the run. The DDL
+    locks the whole table, it gives up after PARTITION_LOCK_TIMEOUT_MS rather
+    than queue the auth requests behind it, the next run tries again.
+    """
+    table = AuthRefreshTokenModel.table_name()
+    partitions = await refresh_token_partitions()
+    last_day = date.today() + timedelta(seconds=auth_settings.REFRESH_TOKEN_EXP)
+    dropped = 0
+
+    async with db_cursor() as cur:
+        await cur.execute(
+            "SELECT pg_try_advisory_xact_lock(%s) AS locked;", (PARTITION_LOCK_ID,)
+        )
+        lock = await cur.fetchone()
+        if not lock or not lock["locked"]:
+            return dropped
+        await cur.execute(f"SET LOCAL lock_timeout = {PARTITION_LOCK_TIMEOUT_MS};")
+
+        # All the DDL goes out in a single round trip
+        async with cur.connection.pipeline():
+            day = date.today()
+            while day <= last_day + timedelta(days=1):
+                if day not in partitions:
+                    await cur.execute(
+                        f"""
+                        CREATE TABLE IF NOT EXISTS {_partition_name(day)}
+                        PARTITION OF {table}
+                        FOR VALUES FROM ('{day.isoformat()}')
+                        TO ('{(day + timedelta(days=1)).isoformat()}');
+                        """
+                    )
+                day += timedelta(days=1)
+
+            for day, name in sorted(partitions.items()):
+                # The partition holds tokens expiring until the end of `day`
+                partition_end = datetime(day.year, day.month, day.day) + timedelta(
+                    days=1
+                )
+                if partition_end > expired_before:
+                    break
+                await cur.execute(f"DROP TABLE IF EXISTS {name};")
+                dropped += 1
+
+    return dropped
+
+
+async def update_refresh_token_table_stats() -> None:
+    query = """
+        SELECT
+            coalesce(sum(pg_total_relation_size(relid)), 0)::bigint AS bytes,
+            coalesce(sum(greatest(c.reltuples, 0)), 0)::bigint AS rows
+        FROM pg_partition_tree(%s::regclass) tree
+        JOIN pg_class c ON c.oid = tree.relid
+        WHERE tree.isleaf;
+    """
+    stats = await fetch_one(query, (AuthRefreshTokenModel.table_name(),))
+    if stats:
+        _table_stats.update(bytes=stats["bytes"], rows=stats["rows"])
+
+
+async def reap_refresh_tokens() -> int:
+    expired_before = datetime.now() - timedelta(
+        seconds=auth_settings.REFRESH_TOKEN_REAPER_GRACE
+    )
+    batch_size = auth_settings.REFRESH_TOKEN_REAPER_BATCH_SIZE
+    started = time.perf_counter()
+
+    if auth_settings.REFRESH_TOKEN_PARTITIONED:
+        try:
+            dropped = await maintain_refresh_token_partitions(expired_before)
+        except psycopg.errors.LockNotAvailable:
+            logging.warning("Refresh token partitions are busy, retrying next run")
+        else:
+            dropped_partitions_counter.add(dropped)
+
+    deleted = 0
+    while True:
+        batch = await delete_expired_refresh_tokens(expired_before, batch_size)
+        deleted += batch
+        deleted_tokens_counter.add(batch)
+        if batch < batch_size:
+            break
+        # Space out the batches to limit the lock and WAL pressure of the reaping
+        await asyncio.sleep(0.05)
+
+    elapsed = time.perf_counter() - started
+    reaper_run_duration.record(elapsed)
+
+    logging.info(
+        f"Refresh token reaper: deleted {deleted} tokens in {elapsed:.2f}s "
+        f"({deleted / elapsed if elapsed else 0:.0f} tokens/s)"
+    )
+    return deleted
+
+
+async def reap_refresh_tokens_once() -> int | None:
+    """
+    Reap unless another worker, of this node or another one, already is.
+    Returns None when the run was skipped.
+    """
+    # The session lock lives on the connection pinned for the run
+    async with unit_of_work():
+        lock = await fetch_one(
+            "SELECT pg_try_advisory_lock(%s) AS locked;", (REAPER_LOCK_ID,)
+        )
+        if not lock or not lock["locked"]:
+            return None
+        try:
+            return await reap_refresh_tokens()
+        finally:
+            await fetch_one("SELECT pg_advisory_unlock(%s);", (REAPER_LOCK_ID,))
+
+
+async def refresh_token_reaper_task() -> None:
+    logging.info("Refresh token reaper started.")
+
+    while True:
+        try:
+            await reap_refresh_tokens_once()
+            await update_refresh_token_table_stats()
+        except asyncio.CancelledError:
+            logging.info("Refresh token reaper task was cancelled.")
+            raise
+        except Exception as e:
+            logging.error(f"Refresh token reaper failed: {e}")
+        await asyncio.sleep(auth_settings.REFRESH_TOKEN_REAPER_INTERVAL)
@@ -0,0 +1,69 @@
+import logging
+import time
+
+from redis.exceptions import RedisError
+
+from src import caching
+from src.auth.config import auth_settings
+
+USER_VERSION_PREFIX = "auth_user_version"
+
+# A version only has to outlive the access tokens that carry it
+USER_VERSION_TTL = max(auth_settings.JWT_EXP, auth_settings.ACCESS_TOKEN_EXP)
+
+
+def _user_version_key(user_id: int) -> str:
+    return f"{USER_VERSION_PREFIX}:{user_id}"
+
+
+def _initial_version() -> int:
+    # A version lost with its key (expiry, eviction, flush) is recreated from
+    # the clock, so it is still higher than anything issued before the loss.
+    return time.time_ns() // 1_000_000
+
+
+async def get_user_version(user_id: int) -> int | None:
+    """Current version of the user claims, None if no token may be trusted."""
+    try:
+        version = await caching.get_by_key(_user_version_key(user_id))
+    except RedisError as e:
+        logging.error(f"User versions are unavailable: {e}")
+        return None
+
+    return int(version) if version is not None else None
+
+
+async def issue_user_version(user_id: int) -> int:
+    """Version to embed in a new access token, kept alive for its lifetime."""
+    key = _user_version_key(user_id)
+    try:
+        async with caching.redis_client.pipeline(transaction=True) as pipe:
+            await pipe.set(key, _initial_version(), nx=True, ex=USER_VERSION_TTL)
+            await pipe.expire(key, USER_VERSION_TTL)
+            await pipe.get(key)
+            *_, version = await pipe.execute()
+    except RedisError as e:
+        logging.error(f"User versions are unavailable: {e}")
+        return 0
+
+    return int(version)
+
+
+async def bump_user_version(*user_ids: int) -> None:
+    """
+    Reject the claims of every access token issued so far to the users.
+
+    Raises `RedisError` when the versions are unavailable, the tokens then stay
+    valid and the change they carry must not be reported as done.
+    """
+    try:
+        async with caching.redis_client.pipeline(transaction=True) as pipe:
+            for user_id in user_ids:
+                key = _user_version_key(user_id)
+                await pipe.set(key, _initial_version(), nx=True, ex=USER_VERSION_TTL)
+                await pipe.incr(key)
+                await pipe.expire(key, USER_VERSION_TTL)
+            await pipe.execute()
+    except RedisError as e:
+        logging.error(f"Failed to bump user versions {user_ids}: {e}")
+        raise
@@ -1,11 +1,345 @@
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import math
+import random
+import time
+import types
+import typing
+from collections import OrderedDict
+from contextvars import Context
 from datetime import timedelta
-from typing import Any, Optional
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Generic,
+    Hashable,
+    Iterable,
+    Mapping,
+    Optional,
+    ParamSpec,
+    Sequence,
+    TypeVar,
+)
 
-from redis.asyncio import Redis
+from opentelemetry import metrics
+from pydantic import TypeAdapter
+from redis.asyncio import BlockingConnectionPool, ConnectionPool, Redis
+from redis.asyncio.connection import AbstractConnection
+from redis.exceptions import RedisError
 
+from src.config import settings
+from src.models import BaseModel
 from src.schema import CustomModel
 
-redis_client: Redis = None  # type: ignore
+V = TypeVar("V")
+P = ParamSpec("P")
+R = TypeVar("R")
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+meter = metrics.get_meter(__name__)
+
+cache_hits_counter = meter.create_counter(
+    "cache.hits", unit="{lookup}", description="Cache lookups served by the cache"
+)
+cache_misses_counter = meter.create_counter(
+    "cache.misses", unit="{lookup}", description="Cache lookups that missed"
+)
+cache_staleness = meter.create_histogram(
+    "cache.staleness",
+    unit="s",
+    description="Age of the cached value at the time it was served",
+)
+cache_latency = meter.create_histogram(
+    "cache.latency",
+    unit="s",
+    description="Duration of calls to cached functions, by outcome",
+)
+
+
+pipeline_size_histogram = meter.create_histogram(
+    "redis.pipeline.size",
+    unit="{command}",
+    description="Commands sent together by the auto-pipelining client",
+)
+pool_wait_histogram = meter.create_histogram(
+    "redis.pool.wait",
+    unit="s",
+    description="Time spent waiting for a free redis connection",
+)
+
+# Commands which neither block nor depend on the connection state, safe to send
+# in a pipeline with the commands of other requests
+PIPELINED_COMMANDS = frozenset(
+    {
+        "DEL",
+        "EXISTS",
+        "EXPIRE",
+        "GET",
+        "INCRBY",
+        "MGET",
+        "PUBLISH",
+        "SADD",
+        "SET",
+        "SMEMBERS",
+        "TTL",
+    }
+)
+
+
+class MeteredConnectionPool(BlockingConnectionPool):
+    """Blocking pool recording how often and how long commands wait for it."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    async def get_connection(
+        self, command_name: Any, *keys: Any, **options: Any
+    ) -> AbstractConnection:
+        get_connection = super().get_connection
+        if self.can_get_connection():
+            return await get_connection(command_name, *keys, **options)  # type: ignore
+
+        started = time.perf_counter()
+        try:
+            return await get_connection(command_name, *keys, **options)  # type: ignore
+        finally:
+            waited = time.perf_counter() - started
+            self.waits += 1
+            self.wait_seconds += waited
+            pool_wait_histogram.record(waited)
+
+
+def create_redis_pool() -> ConnectionPool:
+    """
+    Pool of `REDIS_MAX_CONNECTIONS` per worker. Once all are in use, commands
+    wait up to `REDIS_POOL_TIMEOUT` seconds, or fail at once if not blocking.
+    """
+    if not settings.REDIS_POOL_BLOCKING:
+        return ConnectionPool.from_url(
+            str(settings.REDIS_URL),
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            decode_responses=True,
+        )
+    return MeteredConnectionPool.from_url(
+        str(settings.REDIS_URL),
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+        decode_responses=True,
+    )
+
+
+# Channel of the key invalidations sent by redis to tracking clients
+TRACKING_CHANNEL = "__redis__:invalidate"
+
+_MISSING = object()
+
+
+class NearCache:
+    """
+    Worker memory copy of hot redis keys, kept coherent by redis itself.
+
+    With `CLIENT TRACKING ... BCAST`, redis sends the name of every key written
+    under the tracked prefixes, by any client, to the tracking connection of
+    the worker, which drops its copy at once. Values are only served from
+    memory while that connection is up, all of them are dropped when it is lost.
+    """
+
+    def __init__(self, prefixes: Sequence[str], *, maxsize: int) -> None:
+        self.prefixes = tuple(prefixes)
+        self.maxsize = maxsize
+        self.tracking = False
+        self._values: OrderedDict[str, Any] = OrderedDict()
+        # Keys being read from redis, and those of them written meanwhile,
+        # whose value read may already be stale
+        self._reading: dict[str, int] = {}
+        self._written: set[str] = set()
+        self._epoch = 0
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def tracks(self, key: Any) -> bool:
+        return self.tracking and isinstance(key, str) and key.startswith(self.prefixes)
+
+    async def get(self, key: str, load: Callable[[], Awaitable[Any]]) -> Any:
+        attributes = {"cache": "redis", "tier": "near"}
+        value = self._values.get(key, _MISSING)
+        if value is not _MISSING:
+            self._values.move_to_end(key)
+            cache_hits_counter.add(1, attributes)
+            return value
+
+        cache_misses_counter.add(1, attributes)
+        epoch = self._epoch
+        self._reading[key] = self._reading.get(key, 0) + 1
+        try:
+            value = await load()
+        finally:
+            written = key in self._written
+            self._reading[key] -= 1
+            if not self._reading[key]:
+                del self._reading[key]
+                self._written.discard(key)
+
+        if not written and epoch == self._epoch and self.tracking:
+            self._values[key] = value
+            while len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+        return value
+
+    def invalidate(self, keys: Iterable[str] | None) -> None:
+        if keys is None:
+            # Sent on FLUSHDB / FLUSHALL
+            return self.clear()
+
+        for key in keys:
+            self._values.pop(key, None)
+            if key in self._reading:
+                self._written.add(key)
+
+    def clear(self) -> None:
+        self._values.clear()
+        self._epoch += 1
+
+    async def tracking_task(self, pool: ConnectionPool) -> None:
+        """Receive the invalidations on a connection of its own."""
+        logging.info("Tracking near cached redis keys.")
+
+        prefixes = [arg for prefix in self.prefixes for arg in ("PREFIX", prefix)]
+        while True:
+            connection = pool.make_connection()  # type: ignore[no-untyped-call]
+            try:
+                await connection.connect()
+                await connection.send_command("CLIENT", "ID")
+                client_id = await connection.read_response()
+                await connection.send_command(
+                    "CLIENT",
+                    "TRACKING",
+                    "ON",
+                    "REDIRECT",
+                    client_id,
+                    "BCAST",
+                    *prefixes,
+                )
+                await connection.read_response()
+                await connection.send_command("SUBSCRIBE", TRACKING_CHANNEL)
+                await connection.read_response()
+
+                # Writes may have been missed while (re)connecting
+                self.clear()
+                self.tracking = True
+                while True:
+                    kind, _, keys = await connection.read_response()
+                    if kind == "message":
+                        self.invalidate(keys)
+            except asyncio.CancelledError:
+                logging.info("Near cache tracking was cancelled.")
+                raise
+            except (RedisError, OSError) as e:
+                logging.error(f"Near cache lost its tracking connection: {e}")
+                await asyncio.sleep(1.0)
+            finally:
+                self.tracking = False
+                self.clear()
+                await connection.disconnect()
+
+
+# (command arguments, options, future of the reply)
+PendingCommand = tuple[tuple[Any, ...], dict[str, Any], asyncio.Future[Any]]
+
+
+class AutoPipelineRedis(Redis):
+    """
+    Redis client sending the commands issued within one event loop tick as a
+    single pipeline, so concurrent requests share round trips and connections.
+
+    Only `PIPELINED_COMMANDS` are gathered, others (pub/sub, scripts, explicit
+    pipelines) use a connection of their own as usual. A failed command fails
+    its caller only, a lost connection fails the whole batch.
+
+    GETs of the keys tracked by the `near_cache`, when set, are served from
+    worker memory.
+    """
+
+    def __init__(self, *args: Any, max_batch_size: int = 1000, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.max_batch_size = max_batch_size
+        self.near_cache: NearCache | None = None
+        self._pending: list[PendingCommand] = []
+        self._batches: set[asyncio.Task[None]] = set()
+
+    async def get(self, name: Any) -> Any:
+        get = super().get
+        if self.near_cache is None or not self.near_cache.tracks(name):
+            return await get(name)
+        return await self.near_cache.get(name, lambda: get(name))  # type: ignore[arg-type]
+
+    async def execute_command(self, *args: Any, **options: Any) -> Any:
+        if args[0] not in PIPELINED_COMMANDS:
+            return await super().execute_command(*args, **options)  # type: ignore[no-untyped-call]
+
+        loop = asyncio.get_running_loop()
+        if not self._pending:
+            loop.call_soon(self._dispatch)
+        future = loop.create_future()
+        self._pending.append((args, options, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._dispatch()
+        return await future
+
+    def _dispatch(self) -> None:
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._execute_batch(batch))
+        self._batches.add(task)
+        task.add_done_callback(self._batches.discard)
+
+    async def _execute_batch(self, batch: list[PendingCommand]) -> None:
+        pipeline_size_histogram.record(len(batch))
+        try:
+            async with self.pipeline(transaction=False) as pipe:
+                for args, options, _ in batch:
+                    pipe.execute_command(*args, **options)  # type: ignore[no-untyped-call]
+                results = await pipe.execute(raise_on_error=False)
+        except Exception as e:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (*_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def get_many(self, keys: Sequence[str]) -> list[Any]:
+        """Values of the keys, in order, None for the missing ones."""
+        if not keys:
+            return []
+        return await self.mget(keys)  # type: ignore[no-any-return]
+
+    async def set_many(
+        self, mapping: Mapping[str, Any], ttl: int | timedelta | None = None
+    ) -> None:
+        # The SETs are issued in the same tick, they are sent as one pipeline
+        await asyncio.gather(
+            *(self.set(key, value, ex=ttl) for key, value in mapping.items())
+        )
+
+
+redis_client: AutoPipelineRedis = None  # type: ignore
 
 
 class RedisData(CustomModel):
@@ -14,13 +348,8 @@ class RedisData(CustomModel):
     ttl: Optional[int | timedelta] = None
 
 
-async def set_redis_key(redis_data: RedisData, *, is_transaction: bool = False) -> None:
-    async with redis_client.pipeline(transaction=is_transaction) as pipe:
-        await pipe.set(redis_data.key, redis_data.value)
-        if redis_data.ttl:
-            await pipe.expire(redis_data.key, redis_data.ttl)
-
-        await pipe.execute()
+async def set_redis_key(redis_data: RedisData) -> None:
+    await redis_client.set(redis_data.key, redis_data.value, ex=redis_data.ttl)
 
 
 async def get_by_key(key: str) -> Optional[Any]:
@@ -29,3 +358,475 @@ async def get_by_key(key: str) -> Optional[Any]:
 
 async def delete_by_key(key: str) -> Optional[Any]:
     return await redis_client.delete(key)
+
+
+class LocalCache(Generic[V]):
+    """
+    In-process LRU cache with a TTL per entry.
+
+    Every instance is registered under its name in `local_caches`, so it can be
+    invalidated from other workers through `invalidate`.
+
+    A value read from a slower tier is stored with the `generation` seen before
+    the read: it is dropped if anything was invalidated meanwhile, it may
+    predate the invalidation.
+    """
+
+    def __init__(self, name: str, *, maxsize: int, ttl: float) -> None:
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # key -> (value, expires at, stored at)
+        self._entries: OrderedDict[Hashable, tuple[V, float, float]] = OrderedDict()
+        # Bumped by every invalidation
+        self.generation = 0
+        local_caches[name] = self
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> V | None:
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is None or entry[1] <= now:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            cache_misses_counter.add(1, {"cache": self.name, "tier": "local"})
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        cache_hits_counter.add(1, {"cache": self.name, "tier": "local"})
+        cache_staleness.record(now - entry[2], {"cache": self.name, "tier": "local"})
+        return entry[0]
+
+    def set(
+        self,
+        key: Hashable,
+        value: V,
+        ttl: float | None = None,
+        *,
+        generation: int | None = None,
+    ) -> None:
+        if generation is not None and generation != self.generation:
+            return
+
+        now = time.monotonic()
+        self._entries[key] = (value, now + (self.ttl if ttl is None else ttl), now)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def delete(self, *keys: Hashable) -> None:
+        self.generation += 1
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._entries.clear()
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+local_caches: dict[str, LocalCache[Any]] = {}
+
+
+def _observe_hit_ratio(
+    _: metrics.CallbackOptions,
+) -> Iterable[metrics.Observation]:
+    for name, cache in local_caches.items():
+        yield metrics.Observation(cache.hit_ratio, {"cache": name, "tier": "local"})
+
+
+meter.create_observable_gauge(
+    "cache.hit_ratio",
+    callbacks=[_observe_hit_ratio],
+    description="Share of local cache lookups served from memory",
+)
+
+
+async def invalidate(cache_name: str, *keys: str) -> None:
+    """
+    Drop keys from both tiers: the redis copy and the local copy of every worker.
+    """
+    cache = local_caches.get(cache_name)
+    if cache:
+        cache.delete(*keys)
+
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            if keys:
+                await pipe.delete(*keys)
+            await pipe.publish(
+                INVALIDATION_CHANNEL, json.dumps({"cache": cache_name, "keys": keys})
+            )
+            await pipe.execute()
+    except RedisError as e:
+        logging.error(f"Failed to invalidate {cache_name} cache: {e}")
+
+
+async def delete_prefix(prefix: str, *, batch_size: int = 1000) -> int:
+    """
+    Delete every redis key starting with `prefix`. Keys are walked with SCAN
+    and unlinked `batch_size` at a time, redis is never blocked on the keyspace.
+    """
+    deleted = 0
+    keys: list[str] = []
+    async for key in redis_client.scan_iter(match=f"{prefix}*", count=batch_size):
+        keys.append(key)
+        if len(keys) == batch_size:
+            deleted += await redis_client.unlink(*keys)
+            keys = []
+    if keys:
+        deleted += await redis_client.unlink(*keys)
+    return deleted
+
+
+_delayed_invalidations: set[asyncio.Task[None]] = set()
+
+
+def invalidate_later(delay: float, cache_name: str, *keys: str) -> None:
+    """
+    Invalidate the keys again after `delay`, for values which a lookup racing
+    the write may have cached from a replica that had not replayed it yet.
+    """
+
+    async def _invalidate() -> None:
+        await asyncio.sleep(delay)
+        await invalidate(cache_name, *keys)
+
+    task = asyncio.create_task(_invalidate())
+    _delayed_invalidations.add(task)
+    task.add_done_callback(_delayed_invalidations.discard)
+
+
+def _apply_invalidation(message: dict[str, Any]) -> None:
+    payload = json.loads(message["data"])
+    cache = local_caches.get(payload["cache"])
+    if not cache:
+        return
+
+    if payload["keys"]:
+        cache.delete(*payload["keys"])
+    else:
+        cache.clear()
+
+
+async def invalidation_listener_task() -> None:
+    """Apply invalidations published by other workers to the local caches."""
+    logging.info("Listening for cache invalidations.")
+
+    while True:
+        try:
+            async with redis_client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Invalidations may have been missed while (re)connecting
+                for cache in local_caches.values():
+                    cache.clear()
+
+                async for message in pubsub.listen():
+                    _apply_invalidation(message)
+        except asyncio.CancelledError:
+            logging.info("Cache invalidation listener was cancelled.")
+            raise
+        except RedisError as e:
+            logging.error(f"Cache invalidation listener lost redis connection: {e}")
+            await asyncio.sleep(1.0)
+
+
+CACHED_PREFIX = "cached"
+CACHED_TAG_PREFIX = "cached:tag"
+CACHED_LOCK_PREFIX = "cached:lock"
+CACHED_POLL_INTERVAL = 0.05
+
+# Key or tags of a cached call: a `str.format` template over the arguments of
+# the function, or a function taking the same arguments
+KeyTemplate = str | Callable[..., str]
+TagTemplates = Iterable[str] | Callable[..., Iterable[str]]
+
+
+def _model_of(annotation: Any) -> type[BaseModel] | None:
+    """The database model of an `X` or `X | None` return type."""
+    candidates = [annotation]
+    if typing.get_origin(annotation) in (typing.Union, types.UnionType):
+        args = typing.get_args(annotation)
+        candidates = [arg for arg in args if arg is not type(None)]
+    if len(candidates) == 1 and isinstance(candidates[0], type):
+        if issubclass(candidates[0], BaseModel):
+            return candidates[0]
+    return None
+
+
+class CachedFunction(Generic[P, R]):
+    """
+    Async function whose results are kept in redis, see `cached`.
+
+    Entries are stored as `<recompute seconds> <expires at> <json>`, the first
+    two drive the probabilistic early recomputation (XFetch): the closer an
+    entry is to its expiry and the longer it took to compute, the likelier a
+    call recomputes it ahead of time. Only the call holding the redis lock of
+    the key recomputes, the others keep serving the current value.
+    """
+
+    def __init__(
+        self,
+        func: Callable[P, Awaitable[R]],
+        *,
+        ttl: float | timedelta,
+        key: KeyTemplate | None,
+        tags: TagTemplates,
+        name: str | None,
+        beta: float,
+        lock_timeout: float | None,
+    ) -> None:
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.ttl = ttl.total_seconds() if isinstance(ttl, timedelta) else float(ttl)
+        self.name = name or f"{func.__module__}.{func.__qualname__}"
+        self.key = key
+        self.tags = tags
+        self.beta = beta
+        self.lock_timeout = lock_timeout or min(self.ttl, 10.0)
+        self._signature = inspect.signature(func)
+        self._codec: tuple[Callable[[R], bytes], Callable[[str], R]] | None = None
+        # Recomputations in flight in this worker: (key, wait) -> task
+        self._flights: dict[tuple[str, bool], asyncio.Task[tuple[bool, R]]] = {}
+
+    def _arguments(self, args: Any, kwargs: Any) -> dict[str, Any]:
+        bound = self._signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return bound.arguments
+
+    def _key(self, arguments: dict[str, Any]) -> str:
+        if self.key is None:
+            key = ":".join(str(value) for value in arguments.values())
+        elif isinstance(self.key, str):
+            key = self.key.format(**arguments)
+        else:
+            key = self.key(**arguments)
+        return f"{CACHED_PREFIX}:{self.name}:{key}"
+
+    def _tags(self, arguments: dict[str, Any]) -> list[str]:
+        if callable(self.tags):
+            return list(self.tags(**arguments))
+        return [tag.format(**arguments) for tag in self.tags]
+
+    def key_for(self, *args: P.args, **kwargs: P.kwargs) -> str:
+        """Redis key of the result of a call with these arguments."""
+        return self._key(self._arguments(args, kwargs))
+
+    @property
+    def codec(self) -> tuple[Callable[[R], bytes], Callable[[str], R]]:
+        if self._codec is None:
+            # Resolved on first use, the annotations may refer to later names
+            return_type = typing.get_type_hints(self.func).get("return", Any)
+            adapter: TypeAdapter[R] = TypeAdapter(return_type)
+            model = _model_of(return_type)
+            if model is None:
+                self._codec = adapter.dump_json, adapter.validate_json
+            else:
+                # Database models are validated through their constructor
+                def load(payload: str) -> R:
+                    data = json.loads(payload)
+                    return data if data is None else model(**data)  # type: ignore[return-value]
+
+                self._codec = adapter.dump_json, load
+        return self._codec
+
+    def _expires_early(self, delta: float, expires_at: float) -> bool:
+        jitter = -math.log(1.0 - random.random())
+        return time.time() + delta * self.beta * jitter >= expires_at
+
+    async def __call__(self, *args: P.args, **kwargs: P.kwargs) -> R:
+        started = time.perf_counter()
+        arguments = self._arguments(args, kwargs)
+        key = self._key(arguments)
+        attributes = {"cache": self.name, "tier": "redis"}
+        try:
+            cached = await redis_client.get(key)
+        except RedisError as e:
+            logging.error(f"Cache {self.name} is unavailable: {e}")
+            cached, outcome = None, "error"
+        else:
+            outcome = "miss"
+
+        if cached is not None:
+            delta, expires_at, payload = cached.split(" ", 2)
+            recomputed = False
+            if self._expires_early(float(delta), float(expires_at)):
+                recomputed, value = await self._recompute(key, arguments, args, kwargs)
+                outcome = "early"
+            if not recomputed:
+                # Not due yet, or another call is recomputing it
+                value = self.codec[1](payload)
+                outcome = "hit"
+                cache_hits_counter.add(1, attributes)
+                cache_staleness.record(
+                    time.time() - float(expires_at) + self.ttl, attributes
+                )
+        elif outcome == "error":
+            value = await self.func(*args, **kwargs)
+        else:
+            cache_misses_counter.add(1, attributes)
+            _, value = await self._recompute(key, arguments, args, kwargs, wait=True)
+
+        cache_latency.record(
+            time.perf_counter() - started, {**attributes, "outcome": outcome}
+        )
+        return value
+
+    async def _recompute(
+        self,
+        key: str,
+        arguments: dict[str, Any],
+        args: Any,
+        kwargs: Any,
+        *,
+        wait: bool = False,
+    ) -> tuple[bool, R]:
+        """Recompute the value at most once at a time per worker, see `_locked`."""
+        flight = self._flights.get((key, wait))
+        if flight is None:
+            # The value is shared by several requests, it must not run on the
+            # connection pinned by the unit of work of the one that started it
+            flight = asyncio.create_task(
+                self._locked(key, arguments, args, kwargs, wait=wait),
+                context=Context(),
+            )
+            self._flights[(key, wait)] = flight
+            flight.add_done_callback(lambda _: self._flights.pop((key, wait), None))
+
+        # A cancelled caller must not cancel the recomputation shared with others
+        return await asyncio.shield(flight)
+
+    async def _locked(
+        self,
+        key: str,
+        arguments: dict[str, Any],
+        args: Any,
+        kwargs: Any,
+        *,
+        wait: bool,
+    ) -> tuple[bool, R]:
+        """
+        Recompute the value once across workers: the call holding the lock
+        recomputes. The others give up, or with `wait` they wait for its value
+        until the lock times out and compute their own.
+        """
+        lock = redis_client.lock(
+            f"{CACHED_LOCK_PREFIX}:{key}", timeout=self.lock_timeout, blocking=False
+        )
+        try:
+            locked = await lock.acquire()
+        except RedisError as e:
+            logging.error(f"Cache {self.name} is unavailable: {e}")
+            locked = False
+
+        if not locked:
+            if not wait:
+                return False, None  # type: ignore[return-value]
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(CACHED_POLL_INTERVAL)
+                try:
+                    cached = await redis_client.get(key)
+                except RedisError:
+                    break
+                if cached is not None:
+                    return False, self.codec[1](cached.split(" ", 2)[2])
+
+        try:
+            started = time.perf_counter()
+            value = await self.func(*args, **kwargs)
+            await self._store(key, arguments, value, time.perf_counter() - started)
+            return True, value
+        finally:
+            if locked:
+                try:
+                    await lock.release()
+                except RedisError:
+                    # Expired while recomputing, someone else may hold it now
+                    pass
+
+    async def _store(
+        self, key: str, arguments: dict[str, Any], value: R, delta: float
+    ) -> None:
+        expires_at = time.time() + self.ttl
+        entry = f"{delta:.6f} {expires_at:.3f} {self.codec[0](value).decode()}"
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                await pipe.set(key, entry, px=int(self.ttl * 1000))
+                for tag in self._tags(arguments):
+                    tag_key = f"{CACHED_TAG_PREFIX}:{tag}"
+                    await pipe.sadd(tag_key, key)  # type: ignore[misc]
+                    await pipe.expire(tag_key, math.ceil(self.ttl))
+                await pipe.execute()
+        except RedisError as e:
+            logging.error(f"Cache {self.name} is unavailable: {e}")
+
+    async def invalidate(self, *args: P.args, **kwargs: P.kwargs) -> None:
+        """Drop the cached result of a call with these arguments."""
+        try:
+            await redis_client.delete(self.key_for(*args, **kwargs))
+        except RedisError as e:
+            logging.error(f"Failed to invalidate {self.name} cache: {e}")
+
+
+def cached(
+    ttl: float | timedelta,
+    key: KeyTemplate | None = None,
+    *,
+    tags: TagTemplates = (),
+    name: str | None = None,
+    beta: float = 1.0,
+    lock_timeout: float | None = None,
+) -> Callable[[Callable[P, Awaitable[R]]], CachedFunction[P, R]]:
+    """
+    Keep the results of an async function in redis for `ttl` seconds.
+
+    The key and the tags are templates over the arguments, e.g.
+    `key="{domain_name.domain}"`, all arguments joined by default. Results are
+    compact JSON, validated back into the return type of the function. A higher
+    `beta` recomputes hot keys earlier. Calls go straight to the function while
+    redis is unavailable.
+
+        @cached(ttl=60, key="{user_id}", tags=["user:{user_id}"])
+        async def get_user_by_id(user_id: int) -> AuthUserModel | None: ...
+
+        await invalidate_tags("user:1")
+    """
+
+    def decorator(func: Callable[P, Awaitable[R]]) -> CachedFunction[P, R]:
+        return CachedFunction(
+            func,
+            ttl=ttl,
+            key=key,
+            tags=tags,
+            name=name,
+            beta=beta,
+            lock_timeout=lock_timeout,
+        )
+
+    return decorator
+
+
+async def invalidate_tags(*tags: str) -> None:
+    """Drop every cached result stored with any of the tags."""
+    tag_keys = [f"{CACHED_TAG_PREFIX}:{tag}" for tag in tags]
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for tag_key in tag_keys:
+                await pipe.smembers(tag_key)  # type: ignore[misc]
+            members = await pipe.execute()
+
+        keys = set().union(*members)
+        await redis_client.delete(*keys, *tag_keys)
+    except RedisError as e:
+        logging.error(f"Failed to invalidate cache tags {tags}: {e}")
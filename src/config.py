@@ -31,6 +31,18 @@ class PostgresURL(BaseModel):
 
 class Config(BaseSettings):
     REDIS_URL: RedisDsn
+    # Connections per worker, commands wait for a free one if blocking
+    REDIS_MAX_CONNECTIONS: int = 10
+    REDIS_POOL_BLOCKING: bool = True
+    REDIS_POOL_TIMEOUT: float = 5.0  # seconds
+    # Worker memory copy of the keys under these prefixes, invalidated by redis
+    REDIS_NEAR_CACHE: bool = False
+    REDIS_NEAR_CACHE_SIZE: int = 10_000
+    REDIS_NEAR_CACHE_PREFIXES: list[str] = [
+        "auth_user:",
+        "auth_user_version:",
+        "cached:",
+    ]
 
     SITE_DOMAIN: str
 
@@ -44,13 +56,23 @@ class Config(BaseSettings):
 
     APP_VERSION: str = "1"
 
+    # tmpfs directory of the snapshots shared by the workers of a node
+    SNAPSHOT_DIR: str | None = None
+
     POSTGRES_USER: str
     POSTGRES_DB: str
     POSTGRES_PORT: int
     POSTGRES_HOST: str
     POSTGRES_PASSWORD: str
 
+    # Streaming replica of the same database, read-only queries go there
+    POSTGRES_REPLICA_HOST: str | None = None
+    POSTGRES_REPLICA_PORT: int | None = None
+    POSTGRES_REPLICA_MAX_LAG: float = 5.0  # seconds
+    POSTGRES_REPLICA_LAG_INTERVAL: float = 5.0  # seconds
+
     database: PostgresURL = PostgresURL()
+    replica: PostgresURL | None = None
 
     @model_validator(mode="after")
     def validate_sentry_non_local(self) -> "Config":
@@ -68,6 +90,13 @@ class Config(BaseSettings):
             port=self.POSTGRES_PORT,
             password=self.POSTGRES_PASSWORD,
         )
+        if self.POSTGRES_REPLICA_HOST:
+            self.replica = self.database.model_copy(
+                update={
+                    "host": self.POSTGRES_REPLICA_HOST,
+                    "port": self.POSTGRES_REPLICA_PORT or self.POSTGRES_PORT,
+                }
+            )
         return self
 
     @computed_field  # type: ignore[misc]
@@ -1,66 +1,608 @@
 import asyncio
+import itertools
+import json
 import logging
 import sys
 from contextlib import asynccontextmanager
-from typing import Any, AsyncGenerator, Sequence
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import (
+    Any,
+    AsyncGenerator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Mapping,
+    Sequence,
+    TypeVar,
+)
 
 import psycopg
 import psycopg.rows
-from psycopg_pool import AsyncConnectionPool
+from opentelemetry import metrics
+from psycopg.pq import TransactionStatus
+from psycopg.types.numeric import Int8Dumper
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
 from sqlalchemy import MetaData
 
 from src.config import settings
 
 metadata = MetaData()
 
+T = TypeVar("T")
+
+# Values of the %s placeholders, or of the %(name)s ones
+Params = Sequence[Any] | Mapping[str, Any]
+
 PG_POOL: AsyncConnectionPool = None  # type: ignore
+# Optional streaming replica serving the read-only registered queries
+PG_REPLICA_POOL: AsyncConnectionPool | None = None
+
+# Seconds the replica is behind the primary, None until measured or unreachable
+replica_lag: float | None = None
+
+REPLICA_LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery()
+            OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())
+    END AS lag;
+"""
+
+meter = metrics.get_meter(__name__)
+
+replica_reads_counter = meter.create_counter(
+    "db.replica.reads",
+    unit="{query}",
+    description="Read-only queries served by the replica",
+)
+
+
+@dataclass(frozen=True)
+class Query:
+    """A named statement of the registry, executed as a prepared statement."""
+
+    name: str
+    sql: str
+    # Values preparing a read-only statement when a pooled connection opens
+    warmup: Sequence[Any] | None = None
+    # Safe to serve from the replica, a few seconds behind the primary at most
+    readonly: bool = False
+
+
+queries: dict[str, Query] = {}
+
+
+def register_query(
+    name: str,
+    sql: str,
+    *,
+    warmup: Sequence[Any] | None = None,
+    readonly: bool = False,
+) -> Query:
+    if name in queries:
+        raise ValueError(f"Query {name} is already registered")
+
+    query = Query(name, " ".join(sql.split()), warmup, readonly)
+    queries[name] = query
+    return query
+
+
+async def prepare_queries(conn: psycopg.AsyncConnection[Any]) -> None:
+    """Pool `configure` hook: prepare the registered read-only queries server-side."""
+    async with conn.cursor() as cur:
+        _dump_ints_as_int8(cur)
+        for query in queries.values():
+            if query.warmup is not None:
+                await cur.execute(query.sql, query.warmup, prepare=True)
+    # A rollback would deallocate the statements
+    await conn.commit()
+
+
+def _dump_ints_as_int8(cur: psycopg.AsyncCursor[Any]) -> None:
+    """
+    Send the integers of a registered query as int8, so its prepared statement
+    is reused whatever the magnitude of the ids. Other queries keep the default
+    dumpers, which pick the smallest integer type.
+    """
+    cur.adapters.register_dumper(int, Int8Dumper)
+
+
+def _statement(query: str | Query) -> tuple[str, bool | None]:
+    if isinstance(query, Query):
+        return query.sql, True
+    return query, None
+
+
+class UnitOfWork:
+    """A pooled connection pinned to a block of code, checked out on first use."""
+
+    def __init__(self, transaction: bool) -> None:
+        self.transaction = transaction
+        self.closed = False
+        self._conn: psycopg.AsyncConnection[Any] | None = None
+        self._checkout: Any = None
+
+    async def connection(self) -> psycopg.AsyncConnection[Any]:
+        if self._conn is None:
+            self._checkout = PG_POOL.connection()
+            self._conn = await self._checkout.__aenter__()
+            if not self.transaction:
+                await self._conn.set_autocommit(True)
+        return self._conn
+
+    async def close(self, exc: BaseException | None) -> None:
+        self.closed = True
+        if self._conn is None:
+            return
+
+        try:
+            if not self.transaction and not self._conn.closed:
+                await self._conn.set_autocommit(False)
+        finally:
+            # Commits, or rolls back on error, and returns the connection
+            await self._checkout.__aexit__(type(exc) if exc else None, exc, None)
+
+
+_unit_of_work: ContextVar[UnitOfWork | None] = ContextVar("unit_of_work", default=None)
+
+# Set once the current context ran a statement on the primary which may have
+# written, its later reads must see that write and stay on the primary
+_sticky_primary: ContextVar[bool] = ContextVar("sticky_primary", default=False)
+
+# Suffixes of the server-side cursors opened by `stream`
+_stream_ids = itertools.count()
 
 
 @asynccontextmanager
-async def db_cursor() -> AsyncGenerator[psycopg.AsyncCursor[dict[str, Any]], None]:
-    async with PG_POOL.connection() as conn:
+async def unit_of_work(*, transaction: bool = False) -> AsyncGenerator[None, None]:
+    """
+    Run every query of the block on a single pooled connection.
+
+    Without `transaction` each query commits on its own, as it would on a fresh
+    connection. With it the block is one transaction, rolled back on error.
+    A nested unit joins the outer one.
+    """
+    if _unit_of_work.get() is not None:
+        yield
+        return
+
+    unit = UnitOfWork(transaction)
+    reset_token = _unit_of_work.set(unit)
+    exc: BaseException | None = None
+    try:
+        yield
+    except BaseException as e:
+        exc = e
+        raise
+    finally:
+        _unit_of_work.reset(reset_token)
+        await unit.close(exc)
+
+
+async def request_unit_of_work() -> AsyncGenerator[None, None]:
+    """Route dependency pinning one connection for the whole request."""
+    async with unit_of_work():
+        yield
+
+
+async def request_transaction() -> AsyncGenerator[None, None]:
+    """Route dependency running the whole request in one transaction."""
+    async with unit_of_work(transaction=True):
+        yield
+
+
+def replica_is_usable() -> bool:
+    return (
+        PG_REPLICA_POOL is not None
+        and replica_lag is not None
+        and replica_lag <= settings.POSTGRES_REPLICA_MAX_LAG
+    )
+
+
+def reads_from_primary() -> bool:
+    """Whether read-only queries of the current context stay on the primary."""
+    unit = _unit_of_work.get()
+    return (
+        (unit is not None and not unit.closed)
+        or _sticky_primary.get()
+        or not replica_is_usable()
+    )
+
+
+def _pool(readonly: bool) -> AsyncConnectionPool:
+    if not readonly:
+        _sticky_primary.set(True)
+        return PG_POOL
+    if reads_from_primary():
+        return PG_POOL
+
+    replica_reads_counter.add(1)
+    return PG_REPLICA_POOL  # type: ignore[return-value]
+
+
+@asynccontextmanager
+async def db_connection(
+    *, readonly: bool = False
+) -> AsyncGenerator[psycopg.AsyncConnection[Any], None]:
+    """Connection of the current unit of work, or a pooled one held for the block."""
+    unit = _unit_of_work.get()
+    if unit is None or unit.closed:
+        async with _pool(readonly).connection() as conn:
+            yield conn
+        return
+
+    yield await unit.connection()
+
+
+@asynccontextmanager
+async def db_cursor(
+    *, transaction: bool = True, readonly: bool = False
+) -> AsyncGenerator[psycopg.AsyncCursor[dict[str, Any]], None]:
+    """
+    Cursor on the connection of the current unit of work, or on a fresh one.
+
+    Statements of one cursor block are a single transaction, `transaction=False`
+    lets a single statement skip the BEGIN/COMMIT round trips on a pinned
+    connection. A `readonly` block goes to the replica while it keeps up, unless
+    the context already used the primary.
+    """
+    unit = _unit_of_work.get()
+    if unit is None or unit.closed:
+        async with _pool(readonly).connection() as conn:
+            async with conn.cursor(row_factory=psycopg.rows.dict_row) as cur:
+                yield cur
+        return
+
+    conn = await unit.connection()
+    if not transaction or conn.info.transaction_status != TransactionStatus.IDLE:
+        async with conn.cursor(row_factory=psycopg.rows.dict_row) as cur:
+            yield cur
+        return
+
+    async with conn.transaction():
         async with conn.cursor(row_factory=psycopg.rows.dict_row) as cur:
             yield cur
 
 
-async def execute(query: str, values: Sequence[Any] | None = None) -> None:
-    async with db_cursor() as cur:
-        await cur.execute(query, values)
+def trusted_row(
+    build: Callable[[dict[str, Any]], T],
+) -> psycopg.rows.AsyncRowFactory[T]:
+    """
+    Row factory handing every row to `build` as a dict, e.g. `Model.from_row`.
 
+    Rows come straight from Postgres, so they are already typed and need no
+    validation, the column names are read once per result.
+    """
 
-async def fetch_all(query: str, values: Sequence[Any] | None = None) -> Sequence[Any]:
-    async with db_cursor() as cur:
-        await cur.execute(query, values)
+    def factory(cursor: psycopg.AsyncCursor[Any]) -> psycopg.rows.RowMaker[T]:
+        names = [column.name for column in cursor.description or ()]
+
+        def make_row(values: Sequence[Any]) -> T:
+            return build(dict(zip(names, values)))
+
+        return make_row
+
+    return factory
+
+
+async def execute(query: str | Query, values: Params | None = None) -> int:
+    sql, prepare = _statement(query)
+    async with db_cursor(transaction=False) as cur:
+        if prepare:
+            _dump_ints_as_int8(cur)
+        await cur.execute(sql, values, prepare=prepare)
+        return cur.rowcount
+
+
+async def fetch_all(
+    query: str | Query,
+    values: Params | None = None,
+    *,
+    row_factory: psycopg.rows.AsyncRowFactory[Any] | None = None,
+) -> Sequence[Any]:
+    sql, prepare = _statement(query)
+    readonly = isinstance(query, Query) and query.readonly
+    async with db_cursor(transaction=False, readonly=readonly) as cur:
+        if row_factory is not None:
+            cur.row_factory = row_factory
+        if prepare:
+            _dump_ints_as_int8(cur)
+        await cur.execute(sql, values, prepare=prepare)
         return await cur.fetchall()
 
 
-async def fetch_one(query: str, values: Sequence[Any] | None = None) -> Any | None:
-    async with db_cursor() as cur:
-        res = await cur.execute(query, values)
+async def fetch_one(
+    query: str | Query,
+    values: Params | None = None,
+    *,
+    row_factory: psycopg.rows.AsyncRowFactory[Any] | None = None,
+) -> Any | None:
+    sql, prepare = _statement(query)
+    readonly = isinstance(query, Query) and query.readonly
+    async with db_cursor(transaction=False, readonly=readonly) as cur:
+        if row_factory is not None:
+            cur.row_factory = row_factory
+        if prepare:
+            _dump_ints_as_int8(cur)
+        res = await cur.execute(sql, values, prepare=prepare)
         return await res.fetchone()
 
 
-async def check_db_connection_task() -> None:
-    logging.info("Using polling for connectivity status.")
+async def stream(
+    query: str | Query,
+    values: Params | None = None,
+    *,
+    fetch_size: int = 1000,
+    row_factory: psycopg.rows.AsyncRowFactory[Any] | None = None,
+) -> AsyncGenerator[Any, None]:
+    """
+    Rows of a large result, read through a server-side cursor `fetch_size` rows
+    at a time instead of being loaded at once.
+
+    The cursor lives in a transaction which is held open until the iteration
+    ends, stop early with `contextlib.aclosing` to release it right away.
+    """
+    sql, _ = _statement(query)
+    readonly = isinstance(query, Query) and query.readonly
+    async with db_connection(readonly=readonly) as conn, conn.transaction():
+        async with conn.cursor(
+            f"stream_{next(_stream_ids)}",
+            row_factory=row_factory or psycopg.rows.dict_row,
+        ) as cur:
+            cur.itersize = fetch_size
+            await cur.execute(sql, values)
+            async for row in cur:
+                yield row
+
+
+async def copy_out(
+    query: str | Query,
+    values: Params | None = None,
+    *,
+    options: str = "FORMAT csv, HEADER",
+    chunk_size: int = 64 * 1024,
+) -> AsyncGenerator[bytes, None]:
+    """
+    Raw `COPY ... TO STDOUT` output of a query, for bulk exports.
+
+    Postgres formats the rows itself, nothing is parsed on our side and memory
+    use is bounded by `chunk_size` whatever the size of the result.
+    """
+    sql, _ = _statement(query)
+    readonly = isinstance(query, Query) and query.readonly
+    statement = f"COPY ({sql.rstrip().rstrip(';')}) TO STDOUT ({options})"
+    async with db_connection(readonly=readonly) as conn, conn.cursor() as cur:
+        async with cur.copy(statement, values) as copy:
+            buffer = bytearray()
+            async for data in copy:
+                buffer += data
+                if len(buffer) >= chunk_size:
+                    yield bytes(buffer)
+                    buffer.clear()
+            if buffer:
+                yield bytes(buffer)
+
+
+async def execute_many(query: str | Query, values: Iterable[Sequence[Any]]) -> int:
+    """Run one statement for every set of values, pipelined by psycopg."""
+    sql, prepare = _statement(query)
+    async with db_cursor() as cur:
+        if prepare:
+            _dump_ints_as_int8(cur)
+        await cur.executemany(sql, values)
+        return cur.rowcount
+
+
+class Pipeline:
+    def __init__(self, conn: psycopg.AsyncConnection[Any]) -> None:
+        self._conn = conn
+
+    async def execute(
+        self, query: str | Query, values: Params | None = None
+    ) -> psycopg.AsyncCursor[dict[str, Any]]:
+        """Queue a statement, its cursor can be read once the pipeline exits."""
+        sql, prepare = _statement(query)
+        cur = self._conn.cursor(row_factory=psycopg.rows.dict_row)
+        if prepare:
+            _dump_ints_as_int8(cur)
+        await cur.execute(sql, values, prepare=prepare)
+        return cur
+
+
+@asynccontextmanager
+async def _autocommit(
+    conn: psycopg.AsyncConnection[Any],
+) -> AsyncGenerator[None, None]:
+    if conn.autocommit or conn.info.transaction_status != TransactionStatus.IDLE:
+        yield
+        return
+
+    await conn.set_autocommit(True)
+    try:
+        yield
+    finally:
+        await conn.set_autocommit(False)
+
+
+@asynccontextmanager
+async def pipeline() -> AsyncGenerator[Pipeline, None]:
+    """
+    Send every statement queued in the block in a single network round trip.
+
+    Outside of a transaction the statements share the implicit transaction
+    postgres gives a pipeline until its sync: they commit together when the
+    block exits, or none does. Inside one (unit of work with `transaction`)
+    they simply join it. Reading a result within the block forces a round trip.
+    """
+    _sticky_primary.set(True)
+    unit = _unit_of_work.get()
+    if unit is None or unit.closed:
+        async with PG_POOL.connection() as conn:
+            async with _autocommit(conn), conn.pipeline():
+                yield Pipeline(conn)
+        return
+
+    conn = await unit.connection()
+    async with _autocommit(conn), conn.pipeline():
+        yield Pipeline(conn)
+
+
+async def fetch_many(
+    statements: Sequence[tuple[str | Query, Sequence[Any] | None]],
+) -> list[list[Any]]:
+    """Rows of every statement, all sent in a single round trip."""
+    async with pipeline() as pipe:
+        cursors = [await pipe.execute(query, values) for query, values in statements]
+
+    return [
+        await cur.fetchall() if cur.description is not None else [] for cur in cursors
+    ]
+
+
+async def measure_replica_lag() -> float | None:
+    """Refresh `replica_lag`, an unreachable replica is left out until it answers."""
+    global replica_lag
+    if PG_REPLICA_POOL is None:
+        return None
 
     try:
-        async with await psycopg.AsyncConnection.connect(
-            settings.database.with_db()
+        async with PG_REPLICA_POOL.connection(
+            timeout=settings.POSTGRES_REPLICA_LAG_INTERVAL
         ) as conn:
-            while True:
-                try:
+            cur = await conn.execute(REPLICA_LAG_QUERY)
+            row = await cur.fetchone()
+    except (psycopg.Error, PoolTimeout) as e:
+        logging.error(f"Replica is unavailable, reading from the primary: {e}")
+        replica_lag = None
+        return None
+
+    replica_lag = float(row[0]) if row and row[0] is not None else None
+    if replica_lag is None or replica_lag > settings.POSTGRES_REPLICA_MAX_LAG:
+        logging.warning(f"Replica lags behind, reading from the primary: {replica_lag}")
+    return replica_lag
+
+
+def _observe_replica_lag(
+    _: metrics.CallbackOptions,
+) -> Iterable[metrics.Observation]:
+    if replica_lag is not None:
+        yield metrics.Observation(replica_lag)
+
+
+meter.create_observable_gauge(
+    "db.replica.lag",
+    callbacks=[_observe_replica_lag],
+    unit="s",
+    description="Replay delay of the replica behind the primary",
+)
+
+
+async def replica_lag_task() -> None:
+    logging.info("Replica lag monitoring started.")
+
+    while True:
+        try:
+            await asyncio.sleep(settings.POSTGRES_REPLICA_LAG_INTERVAL)
+            await measure_replica_lag()
+        except asyncio.CancelledError:
+            logging.info("Replica lag monitoring was cancelled.")
+            raise
+
+
+ROW_CHANGE_CHANNEL = "row_change"
+ROW_CHANGE_BATCH_DELAY = 0.05  # seconds a burst of notifications is gathered
+
+# Key columns of the rows changed in a table, None when any row may have changed
+RowChanges = list[dict[str, Any]] | None
+RowChangeHandler = Callable[[RowChanges], Awaitable[None]]
+
+_row_change_handlers: dict[str, list[RowChangeHandler]] = {}
+
+
+def on_row_change(table: str) -> Callable[[RowChangeHandler], RowChangeHandler]:
+    """
+    Register the invalidation of a local copy of `table`. It is called with the
+    rows changed by any client, notified by the triggers of the table.
+    """
+
+    def register(handler: RowChangeHandler) -> RowChangeHandler:
+        _row_change_handlers.setdefault(table, []).append(handler)
+        return handler
+
+    return register
+
+
+def _gather_row_change(
+    changes: dict[str, RowChanges], notification: psycopg.Notify
+) -> None:
+    payload = json.loads(notification.payload)
+    table, rows = payload["table"], payload["rows"]
+    if rows is None or (table in changes and changes[table] is None):
+        changes[table] = None
+    else:
+        changes.setdefault(table, []).extend(rows)  # type: ignore[union-attr]
+
+
+async def _apply_row_changes(changes: dict[str, RowChanges]) -> None:
+    for table, rows in changes.items():
+        for handler in _row_change_handlers.get(table, []):
+            try:
+                await handler(rows)
+            except Exception as e:
+                logging.error(f"Failed to apply {table} row changes: {e}")
+
+
+async def check_db_connection_task() -> None:
+    """
+    Watch the database connection and apply the row changes it is notified of.
+
+    Notifications are read as soon as the connection receives data, a burst of
+    them is applied at once. Changes may have been missed while reconnecting,
+    every table is then considered changed.
+    """
+    logging.info("Using polling for connectivity status.")
+
+    loop = asyncio.get_running_loop()
+    reconnecting = False
+    while True:
+        changes: dict[str, RowChanges] = {}
+        received = asyncio.Event()
+        try:
+            async with await psycopg.AsyncConnection.connect(
+                settings.database.with_db(), autocommit=True
+            ) as conn:
+                conn.add_notify_handler(lambda n: _gather_row_change(changes, n))
+                await conn.execute(f"LISTEN {ROW_CHANGE_CHANNEL}")
+                if reconnecting:
+                    await _apply_row_changes(dict.fromkeys(_row_change_handlers))
+                reconnecting = True
+
+                while True:
+                    # psycopg waits on the same socket while executing, the
+                    # reader is only registered in between
+                    loop.add_reader(conn.fileno(), received.set)
+                    try:
+                        await asyncio.wait_for(received.wait(), 60.0)
+                        await asyncio.sleep(ROW_CHANGE_BATCH_DELAY)
+                    except asyncio.TimeoutError:
+                        logging.info("Database connection: OK")
+                    finally:
+                        loop.remove_reader(conn.fileno())
+                        received.clear()
+
+                    # Reads the notifications received so far
                     await conn.execute("SELECT 1")
-                    logging.info("Database connection: OK")
-                except psycopg.OperationalError as e:
-                    logging.error(f"We lost our database connection: {e}")
-                    # Break the loop and allow graceful shutdown or reconnection logic
-                    break
-                await asyncio.sleep(60.0)  # Check every 60 seconds
-    except asyncio.CancelledError:
-        logging.info("Database connection monitoring task was cancelled.")
-        raise
-    except Exception as e:
-        logging.error(f"Failed to establish database connection: {e}")
+                    if changes:
+                        batch = changes.copy()
+                        changes.clear()
+                        await _apply_row_changes(batch)
+        except asyncio.CancelledError:
+            logging.info("Database connection monitoring task was cancelled.")
+            raise
+        except Exception as e:
+            logging.error(f"We lost our database connection: {e}")
+            await asyncio.sleep(1.0)
 
 
 async def check_db_connection_fd() -> None:
@@ -25,6 +25,11 @@ class BadRequest(DetailedHTTPException):
     DETAIL = "Bad Request"
 
 
+class ServiceUnavailable(DetailedHTTPException):
+    STATUS_CODE = status.HTTP_503_SERVICE_UNAVAILABLE
+    DETAIL = "Service is temporarily unavailable"
+
+
 class NotAuthenticated(DetailedHTTPException):
     STATUS_CODE = status.HTTP_401_UNAUTHORIZED
     DETAIL = "User not authenticated"
@@ -0,0 +1,159 @@
+import asyncio
+from contextvars import Context, ContextVar
+from typing import Any, Awaitable, Callable, Generic, Hashable, Iterable, TypeVar
+
+from opentelemetry import metrics
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+meter = metrics.get_meter(__name__)
+
+batch_size_histogram = meter.create_histogram(
+    "db.loader.batch_size",
+    unit="{key}",
+    description="Keys fetched by a single batched query",
+)
+identity_map_hits_counter = meter.create_counter(
+    "db.identity_map.hits",
+    unit="{lookup}",
+    description="Lookups served by the identity map of the current request",
+)
+
+# Rows already loaded by the current request: (kind, key) -> task of the lookup
+_identity_map: ContextVar[dict[tuple[str, Hashable], asyncio.Future[Any]] | None] = (
+    ContextVar("identity_map", default=None)
+)
+
+
+class IdentityMapMiddleware:
+    """
+    Give every request its own identity map, dropped with the request.
+
+    Websockets get none: a connection lives far longer than its rows stay fresh.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        reset_token = _identity_map.set({})
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _identity_map.reset(reset_token)
+
+
+async def identity_mapped(
+    kind: str, key: Hashable, load: Callable[[], Awaitable[V]]
+) -> V:
+    """
+    Load a row at most once per request; outside of a request it is just `load`.
+
+    The lookup itself is remembered, so dependencies resolving the same row
+    concurrently share a single query. Failed lookups are not remembered.
+    """
+    identity_map = _identity_map.get()
+    if identity_map is None:
+        return await load()
+
+    lookup = identity_map.get((kind, key))
+    if lookup is None:
+        lookup = identity_map[(kind, key)] = asyncio.ensure_future(load())
+    else:
+        identity_map_hits_counter.add(1, {"kind": kind})
+
+    try:
+        return await asyncio.shield(lookup)
+    except Exception:
+        identity_map.pop((kind, key), None)
+        raise
+
+
+def remember(kind: str, key: Hashable, value: Any) -> None:
+    """Add a row loaded by other means, e.g. under another key."""
+    identity_map = _identity_map.get()
+    if identity_map is None:
+        return
+
+    lookup = asyncio.get_running_loop().create_future()
+    lookup.set_result(value)
+    identity_map[(kind, key)] = lookup
+
+
+def forget(kind: str, keys: Iterable[Hashable] | None = None) -> None:
+    """Drop rows changed by the current request, all rows of `kind` by default."""
+    identity_map = _identity_map.get()
+    if not identity_map:
+        return
+
+    if keys is None:
+        for entry in [entry for entry in identity_map if entry[0] == kind]:
+            del identity_map[entry]
+    else:
+        for key in keys:
+            identity_map.pop((kind, key), None)
+
+
+class DataLoader(Generic[K, V]):
+    """
+    Coalesce the lookups made within one event loop tick into a single query.
+
+    `batch_load` gets the distinct keys and returns the found values by key,
+    missing keys resolve to None.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        batch_load: Callable[[list[K]], Awaitable[dict[K, V]]],
+        *,
+        max_batch_size: int = 1000,
+    ) -> None:
+        self.name = name
+        self.batch_load = batch_load
+        self.max_batch_size = max_batch_size
+        self._pending: dict[K, asyncio.Future[V | None]] = {}
+        self._batches: set[asyncio.Task[None]] = set()
+
+    async def load(self, key: K) -> V | None:
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            if not self._pending:
+                loop.call_soon(self._dispatch)
+            future = self._pending[key] = loop.create_future()
+            if len(self._pending) >= self.max_batch_size:
+                self._dispatch()
+
+        # A cancelled caller must not cancel the lookup shared with others
+        return await asyncio.shield(future)
+
+    def _dispatch(self) -> None:
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, {}
+        # The batch serves several requests, it must not run on the connection
+        # pinned by the unit of work of the one that happened to dispatch it
+        task = asyncio.create_task(self._load_batch(batch), context=Context())
+        self._batches.add(task)
+        task.add_done_callback(self._batches.discard)
+
+    async def _load_batch(self, batch: dict[K, asyncio.Future[V | None]]) -> None:
+        batch_size_histogram.record(len(batch), {"loader": self.name})
+        try:
+            values = await self.batch_load(list(batch))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(values.get(key))
@@ -1,47 +1,91 @@
 import asyncio  # noqa: I001
+import logging
 from contextlib import asynccontextmanager
 from typing import Any, AsyncGenerator
 
 import fastapi
-import redis.asyncio as aioredis
 import sentry_sdk
 from fastapi import FastAPI
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from psycopg_pool import AsyncConnectionPool
 from starlette.middleware.cors import CORSMiddleware
 
-from src import caching, database
+from src import caching, database, loaders
+from src.auth import security, service
 from src.chat.router import router as chat_router
 from src.auth.router import router as auth_router
+from src.auth.router import well_known_router
 from src.config import app_configs, settings
-from src.tracing import setup_tracing
+from src.tracing import setup_metrics, setup_tracing
 
 
 @asynccontextmanager
 async def lifespan(_application: FastAPI) -> AsyncGenerator[None, None]:
+    await security.open_password_hasher()
+
     database.PG_POOL = AsyncConnectionPool(
-        conninfo=settings.database.with_db(), open=False
+        conninfo=settings.database.with_db(),
+        configure=database.prepare_queries,
+        open=False,
     )
     # Startup
     await database.PG_POOL.open()
     await database.PG_POOL.wait()
 
+    if settings.replica:
+        database.PG_REPLICA_POOL = AsyncConnectionPool(
+            conninfo=settings.replica.with_db(),
+            configure=database.prepare_queries,
+            open=False,
+        )
+        await database.PG_REPLICA_POOL.open()
+        await database.measure_replica_lag()
+
+    try:
+        await service.domains.registry.reload()
+    except Exception as e:
+        logging.error(f"Domain registry failed to load, using the database: {e}")
+
+    background_tasks: list[asyncio.Task[None]] = []
     if not settings.ENVIRONMENT.is_testing:
-        asyncio.create_task(database.check_db_connection_task())
-
-    redis_pool = aioredis.ConnectionPool.from_url(
-        str(settings.REDIS_URL), max_connections=10, decode_responses=True
-    )
-    caching.redis_client = aioredis.Redis(connection_pool=redis_pool)
+        background_tasks.append(
+            asyncio.create_task(database.check_db_connection_task())
+        )
+        background_tasks.append(
+            asyncio.create_task(service.reaper.refresh_token_reaper_task())
+        )
+        background_tasks.append(
+            asyncio.create_task(service.domains.domain_registry_task())
+        )
+        if database.PG_REPLICA_POOL:
+            background_tasks.append(asyncio.create_task(database.replica_lag_task()))
+
+    redis_pool = caching.create_redis_pool()
+    caching.redis_client = caching.AutoPipelineRedis(connection_pool=redis_pool)
+    if settings.REDIS_NEAR_CACHE:
+        near_cache = caching.NearCache(
+            settings.REDIS_NEAR_CACHE_PREFIXES, maxsize=settings.REDIS_NEAR_CACHE_SIZE
+        )
+        caching.redis_client.near_cache = near_cache
+        background_tasks.append(
+            asyncio.create_task(near_cache.tracking_task(redis_pool))
+        )
+    background_tasks.append(asyncio.create_task(caching.invalidation_listener_task()))
 
     yield
 
+    for task in background_tasks:
+        task.cancel()
     await redis_pool.disconnect()
+    if database.PG_REPLICA_POOL:
+        await database.PG_REPLICA_POOL.close()
     await database.PG_POOL.close()
+    await security.close_password_hasher()
 
 
 app = FastAPI(**app_configs, lifespan=lifespan)
 
+app.add_middleware(loaders.IdentityMapMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
@@ -57,8 +101,9 @@ if settings.ENVIRONMENT.is_deployed:
         environment=settings.ENVIRONMENT,
     )
 
-    # Set up tracing
+    # Set up tracing and metrics
     setup_tracing()
+    setup_metrics()
 
     # Instrument the FastAPI app
     FastAPIInstrumentor.instrument_app(app)
@@ -81,4 +126,5 @@ async def env() -> dict[Any, Any]:
 
 
 app.include_router(auth_router, tags=["auth"])
+app.include_router(well_known_router, tags=["auth"])
 app.include_router(chat_router, tags=["chat"])
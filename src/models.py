@@ -1,10 +1,17 @@
 import datetime
-from typing import Any
+from typing import Any, Self
 
 from pydantic.dataclasses import dataclass as pydantic_dataclass
 from sqlalchemy import String, func
-from sqlalchemy.orm import DeclarativeBase, MappedAsDataclass, mapped_column, registry
+from sqlalchemy.orm import (
+    DeclarativeBase,
+    MappedAsDataclass,
+    configure_mappers,
+    mapped_column,
+    registry,
+)
 from sqlalchemy.orm import Mapped as M
+from sqlalchemy.orm.instrumentation import manager_of_class
 
 from src.constants import Fields
 from src.database import metadata
@@ -36,6 +43,37 @@ class BaseModel(
     def table_name(cls) -> Any:
         return cls.__tablename__
 
+    @classmethod
+    def columns(cls, *, exclude: tuple[str, ...] = (), qualified: bool = False) -> str:
+        """Explicit column list for raw SQL, in table definition order."""
+        return ", ".join(
+            f"{cls.__tablename__}.{column.name}" if qualified else column.name
+            for column in cls.__table__.columns
+            if column.name not in exclude
+        )
+
+    @classmethod
+    def from_row(cls, row: dict[str, Any]) -> Self:
+        """
+        Build an instance from a trusted database row, skipping validation.
+
+        Columns missing from the row are None, like the ones left out of a query.
+        """
+        columns = _row_templates.get(cls)
+        if columns is None:
+            # Instrumentation is set up on first construction, which is skipped
+            configure_mappers()  # type: ignore[no-untyped-call]
+            columns = _row_templates[cls] = dict.fromkeys(cls.__table__.columns.keys())
+
+        instance = manager_of_class(cls).new_instance()
+        instance.__dict__.update(columns)
+        instance.__dict__.update(row)
+        return instance
+
     @property
     def data(cls) -> dict[str, Any]:
         return cls.__dict__
+
+
+# Model -> every column set to None, the starting point of `from_row`
+_row_templates: dict[type[BaseModel], dict[str, None]] = {}
@@ -0,0 +1,168 @@
+"""
+Read-mostly data shared by the workers of a node through memory-mapped files.
+
+A snapshot is an immutable file in `SNAPSHOT_DIR`, a tmpfs (`/dev/shm` under
+gunicorn). The worker holding the lock of a snapshot publishes a new version by
+renaming a new file over the current one. Readers map the current file and
+look values up in place, so all workers share the same pages instead of
+holding a copy each, and a restarted worker finds the snapshot ready.
+"""
+
+import fcntl
+import mmap
+import os
+import struct
+import tempfile
+import time
+import zlib
+from typing import IO, Iterable
+
+MAGIC = b"SNP1"
+# magic, values, hash table slots
+HEADER = struct.Struct("<4sII")
+# hash of the value, offset, length (0 for an empty slot)
+SLOT = struct.Struct("<III")
+
+# Seconds between checks of a reader for a newer snapshot
+CHECK_INTERVAL = 1.0
+
+
+class SharedStringSet:
+    """
+    Set of strings published to a snapshot file: an open addressing hash table
+    of (crc32, offset, length) slots followed by the UTF-8 values.
+
+    `published_at` is the modification time of the file, the publisher touches
+    it when the values did not change so that readers can tell it is alive.
+    """
+
+    def __init__(self, directory: str, name: str) -> None:
+        self.directory = directory
+        self.path = os.path.join(directory, f"{name}.snapshot")
+        self.lock_path = os.path.join(directory, f"{name}.lock")
+        self._published_at: float | None = None
+        self._lock_file: IO[bytes] | None = None
+        self._buffer: mmap.mmap | None = None
+        self._inode: int | None = None
+        self._checked_at = float("-inf")  # monotonic
+
+    @property
+    def published_at(self) -> float | None:
+        """Wall clock time of the last publication, None without a snapshot."""
+        self._mapping()
+        return self._published_at
+
+    @property
+    def is_publisher(self) -> bool:
+        return self._lock_file is not None
+
+    def try_publish(self) -> bool:
+        """
+        Become the publisher of the snapshot unless another process is. The
+        lock is released with the process, another one then takes over.
+        """
+        if self._lock_file is None:
+            lock_file = open(self.lock_path, "ab")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                return False
+            self._lock_file = lock_file
+        return True
+
+    def publish(self, values: Iterable[str]) -> None:
+        encoded = sorted({value.encode() for value in values if value})
+        slots = 1 << (2 * len(encoded)).bit_length()  # at most half full
+        mask = slots - 1
+        table = bytearray(slots * SLOT.size)
+        data = bytearray()
+        data_offset = HEADER.size + len(table)
+        for value in encoded:
+            value_hash = zlib.crc32(value)
+            index = value_hash & mask
+            while SLOT.unpack_from(table, index * SLOT.size)[2]:
+                index = (index + 1) & mask
+            SLOT.pack_into(
+                table,
+                index * SLOT.size,
+                value_hash,
+                data_offset + len(data),
+                len(value),
+            )
+            data += value
+
+        with tempfile.NamedTemporaryFile(
+            dir=self.directory, prefix=".snapshot-", delete=False
+        ) as file:
+            file.write(HEADER.pack(MAGIC, len(encoded), slots))
+            file.write(table)
+            file.write(data)
+        os.replace(file.name, self.path)
+
+    def touch(self) -> None:
+        """Mark the current values as still up to date."""
+        os.utime(self.path)
+
+    def _mapping(self) -> mmap.mmap | None:
+        now = time.monotonic()
+        if now - self._checked_at < CHECK_INTERVAL:
+            return self._buffer
+        self._checked_at = now
+
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._unmap()
+            return None
+
+        if stat.st_ino != self._inode:
+            # Lookups are synchronous, none of them uses the previous mapping
+            self._unmap()
+            with open(self.path, "rb") as file:
+                buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._inode = os.fstat(file.fileno()).st_ino
+            if HEADER.unpack_from(buffer)[0] == MAGIC:
+                self._buffer = buffer
+            else:
+                buffer.close()
+        self._published_at = stat.st_mtime if self._buffer is not None else None
+        return self._buffer
+
+    def _unmap(self) -> None:
+        if self._buffer is not None:
+            self._buffer.close()
+        self._buffer = self._inode = self._published_at = None
+
+    def __len__(self) -> int:
+        buffer = self._mapping()
+        return HEADER.unpack_from(buffer)[1] if buffer is not None else 0
+
+    def __contains__(self, value: object) -> bool:
+        buffer = self._mapping()
+        if buffer is None or not isinstance(value, str):
+            return False
+
+        encoded = value.encode()
+        value_hash = zlib.crc32(encoded)
+        mask = HEADER.unpack_from(buffer)[2] - 1
+        index = value_hash & mask
+        while True:
+            slot_hash, offset, length = SLOT.unpack_from(
+                buffer, HEADER.size + index * SLOT.size
+            )
+            if not length:
+                return False
+            if (
+                slot_hash == value_hash
+                and length == len(encoded)
+                and buffer[offset : offset + length] == encoded
+            ):
+                return True
+            index = (index + 1) & mask
+
+    def close(self) -> None:
+        self._unmap()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
@@ -1,4 +1,9 @@
-from opentelemetry import trace
+from opentelemetry import metrics, trace
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import (
+    ConsoleMetricExporter,
+    PeriodicExportingMetricReader,
+)
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
 
@@ -10,3 +15,9 @@ def setup_tracing() -> None:
     console_exporter = ConsoleSpanExporter()
     span_processor = BatchSpanProcessor(console_exporter)
     provider.add_span_processor(span_processor)
+
+
+def setup_metrics() -> None:
+    reader = PeriodicExportingMetricReader(ConsoleMetricExporter())
+    provider = MeterProvider(metric_readers=[reader])
+    metrics.set_meter_provider(provider)
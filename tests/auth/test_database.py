@@ -1,12 +1,23 @@
+import pathlib
 import time
 
+from src import snapshots
 from src.auth.models import UserRoles
 from src.auth.schemas import AuthUser
+from src.auth.service import domains
 from src.auth.service.core import (
+    create_refresh_token,
     create_user_with_password,
     create_user_with_password_and_role,
+    delete_user,
+    get_refresh_token,
     get_user_by_email,
+    get_user_by_id,
+    rotate_refresh_token,
+    update_user_role,
 )
+from src.database import execute, fetch_one
+from src.snapshots import SharedStringSet
 from tests.base import TestClient, pytest
 
 
@@ -27,3 +38,105 @@ async def test_user_creation_with_roles(client: TestClient) -> None:
     assert regular_user_model.role == UserRoles.USER.value
     assert regular_user_model.is_admin is False
     assert admin_user_model.is_admin is True
+
+
+@pytest.mark.asyncio
+async def test_user_cache_invalidated_on_writes(client: TestClient) -> None:
+    user = AuthUser(email="cached_user@fake.com", password="123Aa!")
+    await create_user_with_password(user)
+
+    cached_user = await get_user_by_email(user.email)
+    assert cached_user and cached_user.is_admin is False
+    assert await get_user_by_id(cached_user.id) is not None
+
+    await update_user_role(cached_user.id, UserRoles.ADMIN)
+    updated_user = await get_user_by_id(cached_user.id)
+    assert updated_user and updated_user.is_admin is True
+
+    await delete_user(user.email)
+    assert await get_user_by_id(cached_user.id) is None
+    assert await get_user_by_email(user.email) is None
+
+
+@pytest.mark.asyncio
+async def test_trusted_rows_hydrate_models(client: TestClient) -> None:
+    await create_user_with_password(
+        AuthUser(email="trusted_rows@fake.com", password="123Aa!")
+    )
+    user = await get_user_by_email("trusted_rows@fake.com")
+    assert user and user.password is None
+
+    refresh_token = await create_refresh_token(user_id=user.id)
+    db_refresh_token = await get_refresh_token(refresh_token)
+    assert db_refresh_token and db_refresh_token.uuid
+    assert db_refresh_token.user_id == user.id
+
+    rotated = await rotate_refresh_token(refresh_token)
+    assert rotated and rotated[0] == user
+
+
+@pytest.mark.asyncio
+async def test_domain_registry_refresh(client: TestClient) -> None:
+    registry = domains.registry
+    await registry.reload()
+    assert not await domains.is_registered("registry.fake.com")
+
+    domain = await fetch_one(
+        """
+        INSERT INTO domain_information (domain_name, subscription_type, is_paid)
+        VALUES (%s, 1, false) RETURNING id;
+        """,
+        ("registry.fake.com",),
+    )
+    assert domain
+    await registry.refresh()
+    assert await domains.is_registered("registry.fake.com")
+
+    await execute("DELETE FROM domain_information WHERE id = %s;", (domain["id"],))
+    await registry.refresh()
+    assert not await domains.is_registered("registry.fake.com")
+
+
+@pytest.mark.asyncio
+async def test_domain_registry_shared_snapshot(
+    client: TestClient, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(snapshots, "CHECK_INTERVAL", 0.0)
+    publisher = domains.DomainRegistry(SharedStringSet(str(tmp_path), "domains"))
+    follower = domains.DomainRegistry(SharedStringSet(str(tmp_path), "domains"))
+    await publisher.reload()
+    await follower.reload()
+    assert not publisher.follows and follower.follows
+    assert follower.is_fresh and not follower.domains
+
+    domain = await fetch_one(
+        """
+        INSERT INTO domain_information (domain_name, subscription_type, is_paid)
+        VALUES (%s, 1, false) RETURNING id;
+        """,
+        ("shared.fake.com",),
+    )
+    assert domain
+    await publisher.refresh()
+    assert "shared.fake.com" in follower
+    assert len(follower) == len(publisher)
+
+    # The publisher is gone, the follower takes over
+    assert publisher.shared is not None
+    publisher.shared.close()
+    await execute("DELETE FROM domain_information WHERE id = %s;", (domain["id"],))
+    await follower.refresh()
+    assert not follower.follows
+    assert "shared.fake.com" not in follower
+    assert follower.shared is not None
+    follower.shared.close()
+
+
+@pytest.mark.asyncio
+async def test_unknown_domains_are_negative_cached(client: TestClient) -> None:
+    domains.registry.changed_after = None  # not loaded, lookups hit the database
+    domains.unknown_domains.clear()
+
+    assert not await domains.is_registered("unknown.fake.com")
+    assert domains.unknown_domains.get("unknown.fake.com")
+    await domains.registry.reload()
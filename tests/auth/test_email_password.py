@@ -32,6 +32,18 @@ async def test_user_register_existing(client: TestClient, fake_user: AuthUser) -
     assert resp.json()["detail"] == EmailTaken.DETAIL, resp.content
 
 
+@pytest.mark.asyncio
+async def test_user_register_existing_other_case(
+    client: TestClient, fake_user: AuthUser
+) -> None:
+    resp = await client.post(
+        "/auth/signup",
+        json={**fake_user.data, "email": fake_user.email.upper()},
+    )
+    assert resp.status_code == EmailTaken.STATUS_CODE, resp.content
+    assert resp.json()["detail"] == EmailTaken.DETAIL, resp.content
+
+
 @pytest.mark.asyncio
 async def test_user_register_require_password(client: TestClient) -> None:
     resp = await client.post(
@@ -0,0 +1,99 @@
+import json
+import time
+from pathlib import Path
+
+import pytest
+import rsa
+from async_asgi_testclient import TestClient
+from jose import jwt
+
+from src.auth.exceptions import InvalidToken
+from src.auth.service.codecs import JWTCodec, create_codec
+from src.auth.service.keys import load_key_ring
+from tests.base import status
+
+SECRET = "test-secret"
+CODECS = ["jose", "fast"]
+
+
+def _codec(name: str) -> JWTCodec:
+    return create_codec(name, SECRET, "HS256")
+
+
+@pytest.mark.parametrize("issuer", CODECS)
+@pytest.mark.parametrize("verifier", CODECS)
+def test_codecs_are_interchangeable(issuer: str, verifier: str) -> None:
+    claims = {"sub": "1", "exp": int(time.time()) + 60, "is_admin": False}
+
+    token = _codec(issuer).encode(claims)
+
+    assert _codec(verifier).decode(token) == claims
+
+
+@pytest.mark.parametrize("name", CODECS)
+def test_codec_rejects_invalid_tokens(name: str) -> None:
+    codec = _codec(name)
+    token = codec.encode({"sub": "1", "exp": int(time.time()) + 60})
+    header, payload, signature = token.split(".")
+
+    for invalid in (
+        f"{header}.{payload}.{signature[:-4]}AAAA",
+        f"{header}.{payload[:-2]}.{signature}",
+        create_codec(name, "other-secret", "HS256").encode({"sub": "1"}),
+        codec.encode({"sub": "1", "exp": int(time.time()) - 1}),
+        "not-a-token",
+    ):
+        with pytest.raises(InvalidToken):
+            codec.decode(invalid)
+
+
+def _write_rsa_key(keys_dir: Path, kid: str, private: bool = True) -> str:
+    public_key, private_key = rsa.newkeys(1024)
+    key = private_key if private else public_key
+    (keys_dir / f"{kid}.pem").write_bytes(key.save_pkcs1())
+    return kid
+
+
+def test_key_ring_verifies_tokens_of_retired_keys(tmp_path: Path) -> None:
+    _write_rsa_key(tmp_path, "2026-01")
+    old_ring = load_key_ring(str(tmp_path), None, "RS256")
+    old_token = old_ring.encode({"sub": "1"})
+
+    _write_rsa_key(tmp_path, "2026-02")
+    ring = load_key_ring(str(tmp_path), "2026-02", "RS256")
+    token = ring.encode({"sub": "2"})
+
+    assert jwt.get_unverified_header(token)["kid"] == "2026-02"
+    assert ring.decode(old_token) == {"sub": "1"}
+    assert ring.decode(token) == {"sub": "2"}
+    with pytest.raises(InvalidToken):
+        old_ring.decode(token)
+
+    jwks = json.loads(ring.jwks)["keys"]
+    assert [key["kid"] for key in jwks] == ["2026-01", "2026-02"]
+    assert all("d" not in key for key in jwks)
+    assert jwt.decode(token, jwks[1], algorithms=["RS256"]) == {"sub": "2"}
+
+
+def test_key_ring_requires_a_private_signing_key(tmp_path: Path) -> None:
+    _write_rsa_key(tmp_path, "retired", private=False)
+    with pytest.raises(ValueError):
+        load_key_ring(str(tmp_path), None, "RS256")
+
+    _write_rsa_key(tmp_path, "current")
+    ring = load_key_ring(str(tmp_path), None, "RS256")
+    assert jwt.get_unverified_header(ring.encode({"sub": "1"}))["kid"] == "current"
+
+
+@pytest.mark.asyncio
+async def test_jwks_endpoint_is_cacheable(client: TestClient) -> None:
+    response = await client.get("/.well-known/jwks.json")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"keys": []}
+    assert "max-age" in response.headers["cache-control"]
+
+    response = await client.get(
+        "/.well-known/jwks.json",
+        headers={"If-None-Match": response.headers["etag"]},
+    )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
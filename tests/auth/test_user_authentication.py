@@ -1,8 +1,12 @@
+import asyncio
 import datetime
 from typing import Any
 from unittest.mock import MagicMock
 
+from src.auth import service
 from src.auth.config import auth_settings
+from src.auth.dependencies.access_token import decode_access_token, verified_tokens
+from src.auth.exceptions import InvalidToken
 from tests.base import TestClient, pytest, pytest_asyncio, status
 
 
@@ -51,3 +55,34 @@ async def test_auth_invalid_with_expired_access_refresh_tokens(
     auth_client: TestClient,
 ) -> None:
     pass
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_rotation_is_single_use(auth_client: TestClient) -> None:
+    refresh_token = auth_client.cookie_jar[auth_settings.REFRESH_TOKEN_KEY].value
+
+    rotations = await asyncio.gather(
+        service.rotate_refresh_token(refresh_token),
+        service.rotate_refresh_token(refresh_token),
+    )
+    assert len([rotated for rotated in rotations if rotated]) == 1, rotations
+    assert not await service.rotate_refresh_token(refresh_token)
+
+
+def test_cached_access_token_rejects_tampered_token() -> None:
+    token = service.jwts.create_access_token(user_id="1")
+    assert decode_access_token(token)["sub"] == "1"
+    assert token in verified_tokens._entries
+
+    header, payload, signature = token.split(".")
+    with pytest.raises(InvalidToken):
+        decode_access_token(f"{header}.{payload}.{signature[:-4]}AAAA")
+
+
+def test_expired_access_token_is_not_cached() -> None:
+    token = service.jwts.create_access_token(
+        user_id="1", expires_delta=datetime.timedelta(seconds=-1)
+    )
+    with pytest.raises(InvalidToken):
+        decode_access_token(token)
+    assert token not in verified_tokens._entries
@@ -1,4 +1,13 @@
+from typing import Any
+
+from redis.exceptions import RedisError
+
+from src import caching
+from src.auth import service
+from src.auth.config import auth_settings
 from src.auth.exceptions import AuthorizationFailed, AuthRequired
+from src.auth.models import UserRoles
+from src.auth.schemas import AuthUser
 from tests.base import TestClient, pytest, status
 
 
@@ -45,3 +54,36 @@ async def test_authorization_admin_user_has_basic_auth(
 ) -> None:
     resp = await auth_admin_client.get("/auth/me")
     assert resp.status_code == status.HTTP_200_OK, resp.content
+
+
+@pytest.mark.asyncio
+async def test_role_change_rejects_stale_access_token(
+    auth_client: TestClient, create_user: AuthUser
+) -> None:
+    user = await service.get_user_by_email(create_user.email)
+    assert user
+
+    await service.update_user_role(user.id, UserRoles.ADMIN)
+    # The stale access token is replaced through the refresh token
+    resp = await auth_client.get("/auth/admin")
+    assert resp.status_code == status.HTTP_200_OK, resp.content
+
+    del auth_client.cookie_jar[auth_settings.REFRESH_TOKEN_KEY]
+    await service.update_user_role(user.id, UserRoles.USER)
+    resp = await auth_client.get("/auth/admin")
+    assert resp.status_code == AuthRequired.STATUS_CODE, resp.content
+
+
+@pytest.mark.asyncio
+async def test_role_change_fails_without_versions(
+    create_user: AuthUser, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    user = await service.get_user_by_email(create_user.email)
+    assert user
+
+    def unavailable(*args: Any, **kwargs: Any) -> Any:
+        raise RedisError("unavailable")
+
+    monkeypatch.setattr(caching.redis_client, "pipeline", unavailable)
+    with pytest.raises(RedisError):
+        await service.update_user_role(user.id, UserRoles.ADMIN)
@@ -0,0 +1,34 @@
+import io
+
+import openpyxl
+
+from src.auth.exceptions import AuthorizationFailed
+from tests.base import TestClient, pytest, status
+
+
+@pytest.mark.asyncio
+async def test_export_users_as_csv(auth_admin_client: TestClient) -> None:
+    resp = await auth_admin_client.get("/auth/users/export")
+    assert resp.status_code == status.HTTP_200_OK, resp.content
+    assert resp.headers["content-type"].startswith("text/csv")
+
+    header, *rows = resp.content.decode().splitlines()
+    assert header.startswith("id,email,role,domain_name")
+    assert any(",test@admin.we,ADMIN," in row for row in rows)
+
+
+@pytest.mark.asyncio
+async def test_export_users_as_xlsx(auth_admin_client: TestClient) -> None:
+    resp = await auth_admin_client.get("/auth/users/export?format=xlsx")
+    assert resp.status_code == status.HTTP_200_OK, resp.content
+
+    workbook = openpyxl.load_workbook(io.BytesIO(resp.content), read_only=True)
+    header, *rows = workbook.active.iter_rows(values_only=True)  # type: ignore[union-attr]
+    assert header[:3] == ("id", "email", "role")
+    assert ("test@admin.we", "ADMIN") in [row[1:3] for row in rows]
+
+
+@pytest.mark.asyncio
+async def test_export_users_requires_admin(auth_client: TestClient) -> None:
+    resp = await auth_client.get("/auth/users/export")
+    assert resp.status_code == AuthorizationFailed.STATUS_CODE, resp.content
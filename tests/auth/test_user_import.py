@@ -0,0 +1,61 @@
+import io
+
+import openpyxl
+
+from src.auth.exceptions import ImportFileNotValid
+from src.auth.service.core import delete_user
+from tests.base import TestClient, pytest, status
+
+EMAILS = ("imported1@fake.com", "Imported2@Fake.com", "test@admin.we")
+
+
+def _xlsx(rows: list[tuple[str | None, ...]]) -> bytes:
+    workbook = openpyxl.Workbook()
+    for row in rows:
+        workbook.active.append(row)  # type: ignore[union-attr]
+    content = io.BytesIO()
+    workbook.save(content)
+    return content.getvalue()
+
+
+@pytest.mark.asyncio
+async def test_import_users_from_csv_and_xlsx(auth_admin_client: TestClient) -> None:
+    csv = b"Email,Password\nimported1@fake.com,Imp0rted!\nnot an email,\n"
+    resp = await auth_admin_client.post(
+        "/auth/users/import", files={"file": ("users.csv", io.BytesIO(csv), "text/csv")}
+    )
+    assert resp.status_code == status.HTTP_200_OK, resp.content
+    assert resp.json()["created"] == 1
+    assert resp.json()["rejected"] == 1
+
+    xlsx = _xlsx(
+        [
+            ("email", "role"),
+            ("IMPORTED1@fake.com", None),
+            ("Imported2@Fake.com", "admin"),
+            ("test@admin.we", None),
+        ]
+    )
+    resp = await auth_admin_client.post(
+        "/auth/users/import", files={"file": ("users.xlsx", io.BytesIO(xlsx), "")}
+    )
+    assert resp.status_code == status.HTTP_200_OK, resp.content
+    assert resp.json()["rows"] == 3
+    assert resp.json()["created"] == 1
+    assert resp.json()["skipped"] == 2
+
+    resp = await auth_admin_client.post(
+        "/auth/signin", json={"email": EMAILS[0], "password": "Imp0rted!"}
+    )
+    for email in EMAILS[:2]:
+        await delete_user(email)
+    assert resp.status_code == status.HTTP_200_OK, resp.content
+
+
+@pytest.mark.asyncio
+async def test_import_users_rejects_other_files(auth_admin_client: TestClient) -> None:
+    resp = await auth_admin_client.post(
+        "/auth/users/import", files={"file": ("users.json", io.BytesIO(b"[]"), "")}
+    )
+    assert resp.status_code == ImportFileNotValid.STATUS_CODE, resp.content
+    assert resp.json()["detail"] == ImportFileNotValid.DETAIL, resp.content
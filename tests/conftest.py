@@ -5,7 +5,7 @@ import psycopg
 import pytest_asyncio
 from async_asgi_testclient import TestClient
 
-from src import config
+from src import caching, config
 from src.auth.schemas import AuthUser
 from src.auth.service.core import create_user_with_password, delete_user
 from src.main import app
@@ -49,6 +49,9 @@ async def client(setup_database: Any) -> AsyncGenerator[TestClient, None]:
     host, port = "127.0.0.1", "9000"
     scope = {"client": (host, port)}
     async with TestClient(app, scope=scope) as test_client:
+        # Cached rows of previous sessions belong to another test database,
+        # the tests have a redis database of their own (see pytest.ini)
+        await caching.redis_client.flushdb()
         yield test_client
 
 
@@ -0,0 +1,136 @@
+import asyncio
+import contextlib
+from typing import Any
+
+from src import caching
+from src.auth.schemas import AuthUser, DomainNameValidator
+from src.auth.service import core
+from tests.base import TestClient, pytest
+
+
+@pytest.mark.asyncio
+async def test_cached_service_functions(client: TestClient) -> None:
+    user = AuthUser(email="cached@email.com", password="S1mpl@Password")
+    await core.create_user_with_password(user)
+    stored = await core.get_user_by_email(user.email)
+    assert stored
+
+    get_user_by_id = caching.cached(ttl=60, key="{user_id}", tags=["user:{user_id}"])(
+        core.get_user_by_id
+    )
+    is_registered = caching.cached(ttl=60, key="{domain_name.domain}")(
+        core.check_domain_is_registered
+    )
+    await get_user_by_id.invalidate(stored.id)
+
+    cached_user = await get_user_by_id(stored.id)
+    assert await caching.redis_client.exists(get_user_by_id.key_for(stored.id))
+    assert await get_user_by_id(stored.id) == cached_user
+    assert cached_user and cached_user.email == user.email
+
+    await caching.invalidate_tags(f"user:{stored.id}")
+    assert not await caching.redis_client.exists(get_user_by_id.key_for(stored.id))
+
+    domain = DomainNameValidator(domain="cached.example.com")
+    assert await is_registered(domain) is False
+    assert await is_registered(domain) is False
+    assert await caching.redis_client.exists(is_registered.key_for(domain))
+
+    await core.delete_user(user.email)
+
+
+@pytest.mark.asyncio
+async def test_user_read_before_an_invalidation_is_not_cached(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    user = AuthUser(email="racing@email.com", password="S1mpl@Password")
+    await core.create_user_with_password(user)
+    key = core._user_email_key(user.email)
+    fetch_one = core.fetch_one
+
+    async def racing_fetch_one(*args: Any, **kwargs: Any) -> Any:
+        row = await fetch_one(*args, **kwargs)
+        # The user changes while its row is on the way
+        core.user_cache.delete(key)
+        return row
+
+    monkeypatch.setattr(core, "fetch_one", racing_fetch_one)
+    try:
+        assert await core._get_user_by_email(user.email)
+        assert not core.user_cache.get(key)
+        assert not await caching.redis_client.exists(key)
+    finally:
+        monkeypatch.undo()
+        await core.delete_user(user.email)
+
+
+@pytest.mark.asyncio
+async def test_cached_recomputes_once(client: TestClient) -> None:
+    calls: list[int] = []
+
+    @caching.cached(ttl=60)
+    async def slow_square(value: int) -> int:
+        calls.append(value)
+        await asyncio.sleep(0.1)
+        return value * value
+
+    await slow_square.invalidate(3)
+    results = await asyncio.gather(*(slow_square(3) for _ in range(5)))
+
+    assert results == [9] * 5
+    assert calls == [3]
+
+    # Due for early recomputation, a single call refreshes it
+    slow_square.beta = 1e9
+    results = await asyncio.gather(*(slow_square(3) for _ in range(5)))
+    assert results == [9] * 5
+    assert calls == [3, 3]
+    await slow_square.invalidate(3)
+
+
+@pytest.mark.asyncio
+async def test_auto_pipelined_commands(client: TestClient) -> None:
+    redis = caching.redis_client
+    await redis.set_many({"pipelined:1": "1", "pipelined:a": "a"}, ttl=60)
+
+    values, ttl, incremented, failed = await asyncio.gather(
+        redis.get_many(["pipelined:1", "pipelined:a", "pipelined:missing"]),
+        redis.ttl("pipelined:a"),
+        redis.incr("pipelined:1"),
+        redis.incr("pipelined:a"),
+        return_exceptions=True,
+    )
+
+    assert values == ["1", "a", None]
+    assert 0 < ttl <= 60
+    assert incremented == 2
+    assert isinstance(failed, caching.RedisError)
+    await redis.delete("pipelined:1", "pipelined:a")
+
+
+@pytest.mark.asyncio
+async def test_near_cache_is_invalidated_by_redis(client: TestClient) -> None:
+    redis = caching.redis_client
+    near_cache = caching.NearCache(["near:"], maxsize=10)
+    tracking = asyncio.create_task(near_cache.tracking_task(redis.connection_pool))
+    redis.near_cache = near_cache
+    try:
+        while not near_cache.tracking:
+            await asyncio.sleep(0.01)
+
+        await redis.set("near:1", "a")
+        assert await redis.get("near:1") == "a"
+        assert len(near_cache) == 1
+        assert await redis.get("near:1") == "a"
+
+        # Whichever client writes it, redis pushes the invalidation
+        await redis.set("near:1", "b")
+        while len(near_cache):
+            await asyncio.sleep(0.01)
+        assert await redis.get("near:1") == "b"
+    finally:
+        redis.near_cache = None
+        tracking.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await tracking
+        await redis.delete("near:1")
@@ -0,0 +1,215 @@
+import asyncio
+import contextlib
+import contextvars
+import re
+
+import psycopg
+import pytest
+from psycopg_pool import AsyncConnectionPool
+
+from src import caching, database
+from src.auth.models import UserRoles
+from src.auth.schemas import AuthUser
+from src.auth.service import core, queries
+from src.config import settings
+from tests.conftest import TestClient
+
+
+@pytest.mark.asyncio
+async def test_unit_of_work_pins_one_connection(client: TestClient) -> None:
+    checkouts = database.PG_POOL.get_stats()["requests_num"]
+
+    async with database.unit_of_work():
+        first = await database.fetch_one("SELECT pg_backend_pid() AS pid;")
+        second = await database.fetch_one("SELECT pg_backend_pid() AS pid;")
+        async with database.db_cursor() as cur:
+            await cur.execute("SELECT pg_backend_pid() AS pid;")
+            third = await cur.fetchone()
+
+    assert first == second == third
+    assert database.PG_POOL.get_stats()["requests_num"] - checkouts == 1
+
+
+@pytest.mark.asyncio
+async def test_unit_of_work_transaction_rolls_back(client: TestClient) -> None:
+    await database.execute("CREATE TABLE IF NOT EXISTS uow_test (id int);")
+
+    with pytest.raises(RuntimeError):
+        async with database.unit_of_work(transaction=True):
+            await database.execute("INSERT INTO uow_test VALUES (1);")
+            raise RuntimeError()
+
+    async with database.unit_of_work():
+        await database.execute("INSERT INTO uow_test VALUES (2);")
+
+    rows = await database.fetch_all("SELECT id FROM uow_test;")
+    await database.execute("DROP TABLE uow_test;")
+    assert rows == [{"id": 2}]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_statements(client: TestClient) -> None:
+    await database.execute("CREATE TABLE IF NOT EXISTS pipeline_test (id int);")
+    inserted = await database.execute_many(
+        "INSERT INTO pipeline_test VALUES (%s);", [(1,), (2,), (3,)]
+    )
+
+    deleted, rows = await database.fetch_many(
+        [
+            ("DELETE FROM pipeline_test WHERE id = %s RETURNING id;", (1,)),
+            ("SELECT id FROM pipeline_test ORDER BY id;", None),
+        ]
+    )
+    with pytest.raises(psycopg.errors.DivisionByZero):
+        await database.fetch_many(
+            [
+                ("DELETE FROM pipeline_test;", None),
+                ("SELECT 1 / 0;", None),
+            ]
+        )
+    remaining = await database.fetch_all("SELECT id FROM pipeline_test ORDER BY id;")
+    await database.execute("DROP TABLE pipeline_test;")
+
+    assert inserted == 3
+    assert remaining == rows
+    assert deleted == [{"id": 1}]
+    assert rows == [{"id": 2}, {"id": 3}]
+
+
+@pytest.mark.asyncio
+async def test_registry_queries_are_prepared(client: TestClient) -> None:
+    warmed = {
+        query.sql.replace("%s", "$")
+        for query in database.queries.values()
+        if query.warmup
+    }
+    async with database.PG_POOL.connection() as conn:
+        cur = await conn.execute("SELECT statement FROM pg_prepared_statements;")
+        prepared = {re.sub(r"\$\d+", "$", row[0]) for row in await cur.fetchall()}
+
+    assert warmed
+    assert warmed <= prepared
+    assert "password" not in database.queries["auth_user_by_email"].sql
+
+
+@pytest.mark.asyncio
+async def test_only_registry_queries_send_ints_as_int8(client: TestClient) -> None:
+    async with database.unit_of_work():
+        row = await database.fetch_one("SELECT pg_typeof(%s)::text AS type;", (1,))
+        await database.fetch_one(queries.USER_BY_ID, (2**40,))
+        prepared = await database.fetch_all(
+            "SELECT parameter_types::text[] AS types FROM pg_prepared_statements "
+            "WHERE statement LIKE %s;",
+            (f"%FROM {queries.USERS} WHERE id = $1%",),
+        )
+
+    assert row == {"type": "smallint"}
+    assert prepared == [{"types": ["bigint"]}]
+
+
+@pytest.mark.asyncio
+async def test_readonly_queries_use_the_replica(client: TestClient) -> None:
+    replica = AsyncConnectionPool(
+        settings.database.with_db(), configure=database.prepare_queries, open=False
+    )
+    await replica.open()
+    database.PG_REPLICA_POOL = replica
+
+    def replica_checkouts() -> int:
+        return replica.get_stats().get("requests_num", 0)
+
+    async def reads() -> list[int]:
+        checkouts = [replica_checkouts()]
+        await database.fetch_one(queries.USER_BY_ID, (0,))
+        checkouts.append(replica_checkouts())
+        async with database.unit_of_work():
+            await database.fetch_one(queries.USER_BY_ID, (0,))
+        checkouts.append(replica_checkouts())
+        await database.execute("SELECT 1;")
+        await database.fetch_one(queries.USER_BY_ID, (0,))
+        checkouts.append(replica_checkouts())
+        return checkouts
+
+    def in_new_context() -> asyncio.Task[list[int]]:
+        return asyncio.create_task(reads(), context=contextvars.Context())
+
+    try:
+        assert await database.measure_replica_lag() == 0
+        before, after_read, after_unit, after_write = await in_new_context()
+        assert after_read == before + 1
+        assert after_write == after_unit == after_read
+
+        database.replica_lag = settings.POSTGRES_REPLICA_MAX_LAG + 1
+        before, *checkouts = await in_new_context()
+        assert checkouts == [before] * 3
+    finally:
+        database.PG_REPLICA_POOL = None
+        database.replica_lag = None
+        await replica.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_and_copy_out(client: TestClient) -> None:
+    query = "SELECT g AS id FROM generate_series(1, %s) g ORDER BY g;"
+    rows = [row async for row in database.stream(query, (2500,), fetch_size=100)]
+    chunks = [
+        chunk async for chunk in database.copy_out(query, (2500,), chunk_size=1024)
+    ]
+    csv = b"".join(chunks).decode().splitlines()
+
+    assert rows == [{"id": i} for i in range(1, 2501)]
+    assert len(chunks) > 1
+    assert csv == ["id", *map(str, range(1, 2501))]
+
+
+@pytest.mark.asyncio
+async def test_row_changes_invalidate_cached_users(client: TestClient) -> None:
+    user = AuthUser(email="row.change@email.com", password="S1mpl@Password")
+    await core.create_user_with_password(user)
+    stored = await core.get_user_by_email(user.email)
+    assert stored and stored.role == UserRoles.USER.value
+
+    listener = asyncio.create_task(database.check_db_connection_task())
+    try:
+        await asyncio.sleep(0.5)  # LISTEN
+        # Changed behind the back of the service
+        await database.execute(
+            f"UPDATE {queries.USERS} SET role = %s WHERE id = %s;",
+            (UserRoles.ADMIN.value, stored.id),
+        )
+        for _ in range(50):
+            if not core.user_cache.get(core._user_id_key(stored.id)):
+                break
+            await asyncio.sleep(0.1)
+
+        changed = await core.get_user_by_id(stored.id)
+        assert changed and changed.role == UserRoles.ADMIN.value
+    finally:
+        listener.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await listener
+        await core.delete_user(user.email)
+
+
+@pytest.mark.asyncio
+async def test_bulk_row_changes_flush_cached_users(client: TestClient) -> None:
+    user = AuthUser(email="bulk.change@email.com", password="S1mpl@Password")
+    await core.create_user_with_password(user)
+    stored = await core.get_user_by_email(user.email)
+    assert stored
+    key = core._user_id_key(stored.id)
+    assert await core._get_cached_user(key)
+
+    try:
+        # Too many rows for the notification, every cached user is dropped
+        await core._forget_changed_users(None)
+
+        assert not core.user_cache.get(key)
+        assert not await caching.redis_client.exists(key)
+
+        # The other listeners of the same notification leave redis to it
+        assert await core._get_user_by_email(user.email)
+        await core._forget_changed_users(None)
+        assert await caching.redis_client.exists(key)
+    finally:
+        await core.delete_user(user.email)
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from src import loaders
+
+
+@pytest.mark.asyncio
+async def test_data_loader_coalesces_concurrent_loads() -> None:
+    batches: list[list[int]] = []
+
+    async def batch_load(keys: list[int]) -> dict[int, str]:
+        batches.append(keys)
+        return {key: str(key) for key in keys if key != 3}
+
+    loader = loaders.DataLoader("test", batch_load)
+    results = await asyncio.gather(*(loader.load(key) for key in (1, 2, 2, 3)))
+
+    assert results == ["1", "2", "2", None]
+    assert batches == [[1, 2, 3]]
+
+
+@pytest.mark.asyncio
+async def test_identity_map_loads_a_row_once_per_request() -> None:
+    loads: list[int] = []
+
+    async def load() -> int:
+        loads.append(1)
+        return 1
+
+    async def request() -> None:
+        assert await loaders.identity_mapped("row", 1, load) == 1
+        assert await loaders.identity_mapped("row", 1, load) == 1
+        loaders.forget("row", [1])
+        assert await loaders.identity_mapped("row", 1, load) == 1
+
+    app = loaders.IdentityMapMiddleware(lambda *_: request())  # type: ignore
+    await app({"type": "http"}, None, None)  # type: ignore
+
+    assert len(loads) == 2
+
+
+@pytest.mark.asyncio
+async def test_identity_map_skips_websockets() -> None:
+    loads: list[int] = []
+
+    async def load() -> int:
+        loads.append(1)
+        return 1
+
+    async def connection() -> None:
+        assert await loaders.identity_mapped("row", 1, load) == 1
+        assert await loaders.identity_mapped("row", 1, load) == 1
+
+    app = loaders.IdentityMapMiddleware(lambda *_: connection())  # type: ignore
+    await app({"type": "websocket"}, None, None)  # type: ignore
+
+    assert len(loads) == 2